@@ -0,0 +1,137 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Admission control in front of the local model server.
+#
+# Every LLM call takes a slot. Slots are handed out round-robin across users,
+# so one learner firing off messages only ever competes with everyone else for
+# their own turn. A request is refused up front (-> 429 + Retry-After) when
+# its expected queue wait would already miss the latency SLO.
+
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "2"))
+LLM_LATENCY_SLO = float(os.environ.get("LLM_LATENCY_SLO", "30"))
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after, reason="The tutor is busy right now. Please try again shortly."):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Ticket:
+    __slots__ = ("user_id", "granted", "enqueued_at")
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(self, capacity=LLM_CONCURRENCY, max_in_flight_per_user=1, max_queued_per_user=3,
+                 latency_slo=LLM_LATENCY_SLO, initial_service_time=3.0):
+        self.capacity = capacity
+        self.max_in_flight_per_user = max_in_flight_per_user
+        self.max_queued_per_user = max_queued_per_user
+        self.latency_slo = latency_slo
+        self.service_time = initial_service_time  # EWMA of seconds per call
+
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # user -> deque of waiting tickets, in round-robin order
+        self._in_flight = {}          # user -> granted and not yet released
+        self._running = 0
+        self.rejected = 0
+
+    # --- SCHEDULING (call with self._cond held) ---
+    def _eligible(self, user_id):
+        return self._in_flight.get(user_id, 0) < self.max_in_flight_per_user
+
+    def _dispatch(self):
+        granted = False
+        while self._running < self.capacity:
+            user_id = next((u for u in self._queues if self._eligible(u)), None)
+            if user_id is None:
+                break
+            queue = self._queues.pop(user_id)
+            ticket = queue.popleft()
+            if queue:
+                self._queues[user_id] = queue  # back of the rotation
+            ticket.granted = True
+            self._running += 1
+            self._in_flight[user_id] = self._in_flight.get(user_id, 0) + 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _expected_wait(self, user_id):
+        # With round-robin, a new request from this user waits behind its own
+        # queued requests plus at most one request per round from everyone else.
+        own = len(self._queues.get(user_id, ()))
+        rounds = own + 1
+        ahead = own + sum(min(len(q), rounds) for u, q in self._queues.items() if u != user_id)
+        if self._running >= self.capacity or ahead:
+            ahead += 1  # wait for a running call to finish
+        return ahead * self.service_time / self.capacity
+
+    def _remove(self, ticket):
+        queue = self._queues.get(ticket.user_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.user_id]
+
+    # --- PUBLIC API ---
+    @contextmanager
+    def slot(self, user_id):
+        """Hold one model slot for the duration of the block. Raises Overloaded instead of queueing past the SLO."""
+        with self._cond:
+            if len(self._queues.get(user_id, ())) >= self.max_queued_per_user:
+                self.rejected += 1
+                raise Overloaded(math.ceil(self.service_time), "You already have several messages waiting. Please wait for a reply.")
+            wait = self._expected_wait(user_id)
+            if wait > self.latency_slo:
+                self.rejected += 1
+                raise Overloaded(math.ceil(wait - self.latency_slo + self.service_time))
+
+            ticket = _Ticket(user_id)
+            self._queues.setdefault(user_id, deque()).append(ticket)
+            self._dispatch()
+            deadline = ticket.enqueued_at + self.latency_slo
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Our estimate was off (slow generations); give up rather than wait forever
+                    self._remove(ticket)
+                    self.rejected += 1
+                    raise Overloaded(math.ceil(self.service_time))
+                self._cond.wait(remaining)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._in_flight[user_id] -= 1
+                if not self._in_flight[user_id]:
+                    del self._in_flight[user_id]
+                self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - started)
+                self._dispatch()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self._running,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "users_waiting": len(self._queues),
+                "service_time": round(self.service_time, 3),
+                "rejected": self.rejected,
+            }
+
+
+admission = AdmissionController()
@@ -0,0 +1,131 @@
+"""
+Benchmark for sanitizer.py against the original substring + regex check.
+
+    python bench_sanitizer.py                    # built-in corpus
+    python bench_sanitizer.py replies.jsonl      # one {"reply": "..."} per line
+
+The built-in corpus mirrors tutor replies on the seeded projects: plain
+explanations, prose that mentions keywords like "def" or "class", and replies
+that leak code (fenced, unfenced, indented, or behind a "Step 1:" label or
+"> " quote). Pass a JSONL file to run it on replies captured from a live
+model instead.
+"""
+import json
+import random
+import re
+import sys
+import time
+
+from sanitizer import StreamSanitizer, sanitize
+
+CORPUS = [
+    "Think of the queue like a line at a coffee shop. The first person in line is served first. What should happen to the tail pointer when the line becomes empty?",
+    "A node is like a train car: it holds its own cargo (the title and artist) and a coupling to the next car. What do you think the coupling should point to for the last car?",
+    "Great start! You mentioned the head, but what about the tail? If you only track the head, how long does adding a song to the end take?",
+    "When the queue is empty, both head and tail are None. After you add the first song, which of them should point to it?",
+    "Let's define the function that adds a song. In Python you'd use def to create it, but first tell me in words: what are the two cases you need to handle?",
+    "You're close. Here is what the method looks like:\n```python\ndef add_song(self, title, artist):\n    new_song = SongNode(title, artist)\n    if self.head is None:\n        self.head = new_song\n```\nCan you finish the else branch?",
+    "An undo stack works like a stack of plates. The last plate you put down is the first you pick up. When you write new text, what happens to everything in the redo stack?",
+    "Two stacks: history and future. Undo pops from history and pushes onto future. Which stack does redo pop from?",
+    "Concept Explanation: Base62 uses digits, lowercase and uppercase letters.\nQuestion: Why do we start the counter at a large number like 1000000?",
+    "Repeatedly take the id modulo 62 to get the next character, then divide by 62. In which order do the characters come out, and what must you do at the end?",
+    "Here's a sketch:\nwhile _id > 0:\n    val = _id % 62\n    short_url.append(self.chars[val])\n    _id = _id // 62\nWhat does the final reverse do?",
+    "Breadth-first search explores friends level by level. You need a queue and a visited set. Why is the visited set important in a social graph?",
+    "Friends of friends are at distance two. If you start BFS from the user, at which level do recommendations appear?",
+    "A Trie node holds a dictionary of children and a flag. The flag marks where a word ends. Why can't you just check whether a node has no children?",
+    "To insert, walk character by character. If the child doesn't exist, create it. Set `node.is_end_of_word = True` at the end. What happens for a word that is a prefix of another?",
+    "For search, first walk down the prefix. If you fall off the tree, return an empty list. Otherwise, collect every word under that node, for example with a recursive helper like `_collect_words(node, prefix)`.",
+    "Each directory keeps a map from name to child Directory. The file system keeps a pointer to the current directory. What does mkdir change?",
+    "For cd, look up the child by name and move current to it. How would you support '..' without a parent pointer?",
+    "A max-heap for buys and a min-heap for sells. The best bid is the highest buy price; the best ask is the lowest sell. When can a trade happen?",
+    "Python's heapq is a min-heap, so for buy orders you can store negative prices or flip the comparison in __lt__. Which one would you prefer and why?",
+    "import heapq\nclass OrderBook:\n    def __init__(self):\n        self.buy_heap = []\n        self.sell_heap = []",
+    "Matching runs while the best buy is at least the best sell. Trade the smaller quantity, reduce both, and pop any order that reaches zero. What stops the loop?",
+    "An LRU cache pairs a hash map with a doubly linked list. The map gives O(1) lookups; the list keeps usage order. Why do dummy head and tail nodes simplify the code?",
+    "On get, move the node to the front. On put, add to the front and, if you're over capacity, evict the node right before the tail. What must you also remove from the map?",
+    "Here is the helper:\n    def _remove(self, node):\n        prev = node.prev\n        nxt = node.next\n        prev.next = nxt\n        nxt.prev = prev\nNow explain _add_to_front in words.",
+    "Dijkstra keeps a priority queue of (distance, node). Pop the closest unvisited node and relax its edges. Why is it safe to skip a node once it's visited?",
+    "Count frequencies first: collections.Counter does that in one call. Then build a min-heap of nodes. Which two nodes do you combine at each step?",
+    "Huffman merges the two least frequent nodes into a parent whose frequency is their sum. When does the loop stop, and what is left in the heap?",
+    "if len(heap) > 1:\n    left = heapq.heappop(heap)\n    right = heapq.heappop(heap)\n\nWhat do you push back?",
+    "Remember: the class keyword defines a blueprint. You'll need one for the node and one for the tree. What attributes does the node need?",
+    "Let's build it up.\nStep 1: new_song = SongNode(title, artist)\nStep 2: link it after the current tail. Which pointer do you update first?",
+    "Undo just needs the last state back.\nHint: return self.current_text\nWhat should happen if history is empty?",
+    "Here's the key line:\n> self.head = new_node\nWhy must this happen before you move the tail?",
+    "First check whether the queue is empty.\nThen: if self.head is None: self.head = new_song\nWhat about the tail in that case?",
+    "Time complexity: O(1)",
+    "With the map plus the linked list both operations are constant time:\n- get: O(1)\n- put: O(1)\nWhy would a plain list make get slower?",
+    "Costs for the order book:\n1. Insert: O(log n)\n2. Best price: O(1)\nWhich heap operation gives you the best price?",
+]
+
+
+def legacy_sanitize(ai_reply):
+    # The original check from chat_with_ai, for comparison
+    forbidden = ["class ", "def ", "import ", "```"]
+    if any(bad_word in ai_reply for bad_word in forbidden):
+        ai_reply = "I cannot write the code yet. Let's focus on the logic.\n\nHint: ..."
+    ai_reply = re.sub(r'^(Concept Explanation|User Input|Current Step|INSTRUCTIONS|Question):?\s*', '', ai_reply, flags=re.MULTILINE | re.IGNORECASE)
+    return ai_reply.strip()
+
+
+def chunked(text, rng):
+    # Model deltas are usually 1-8 characters
+    i = 0
+    while i < len(text):
+        n = rng.randint(1, 8)
+        yield text[i:i + n]
+        i += n
+
+
+def stream_sanitize(chunks):
+    s = StreamSanitizer()
+    out = [s.feed(chunk) for chunk in chunks]
+    out.append(s.close())
+    return "".join(out)
+
+
+def timeit(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    corpus = CORPUS
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            corpus = [json.loads(line)["reply"] for line in f if line.strip()]
+
+    rng = random.Random(0)
+    chunk_lists = [list(chunked(text, rng)) for text in corpus]
+    total_chars = sum(len(t) for t in corpus)
+    repeat = 50
+
+    # Streaming must produce exactly what the one-shot call produces
+    for text, chunks in zip(corpus, chunk_lists):
+        assert stream_sanitize(chunks) == sanitize(text)[0], text
+
+    legacy_blocked = sum("I cannot write the code yet" in legacy_sanitize(t) for t in corpus)
+    results = [sanitize(t) for t in corpus]
+    redacted = sum(1 for _, n, _ in results if n)
+    fallback = sum(1 for _, n, prose in results if n and not prose)
+
+    print(f"Corpus: {len(corpus)} replies, {total_chars} chars")
+    print(f"Legacy: {legacy_blocked} replies replaced wholesale")
+    print(f"New:    {redacted} replies with spans redacted, {fallback} with no prose left (hint fallback)\n")
+    print(f"{'variant':<22}{'us/reply':>10}{'MB/s':>10}")
+    for name, fn, items in [
+        ("legacy (whole reply)", legacy_sanitize, corpus),
+        ("sanitize (one shot)", sanitize, corpus),
+        ("StreamSanitizer", stream_sanitize, chunk_lists),
+    ]:
+        elapsed = timeit(fn, items, repeat)
+        print(f"{name:<22}{elapsed / len(corpus) * 1e6:>10.1f}{total_chars / elapsed / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
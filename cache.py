@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache + rate-limit storage that works the same with one process or many.
+#
+# MemoryBackend is the default (single uvicorn worker, tests). Set REDIS_URL
+# (e.g. redis://localhost:6379/0) to share entries and counters between
+# workers through any Redis-protocol server. `redis` is only imported then.
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=10000, sweep_interval=60):
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+        # Rate-limit counters live apart from cache entries: LRU eviction must
+        # never reset someone's window, and every counter expires, so a
+        # periodic sweep keeps this bounded by the keys active in one window
+        self._counters = {}  # key -> (count, expires_at)
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _store(self, key, value, ttl):
+        self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            return entry[0] if entry else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    def _sweep(self, now):
+        self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+        self._next_sweep = now + self.sweep_interval
+
+    def incr(self, key, ttl):
+        """Increment a counter, starting a new `ttl`-second window if it doesn't exist. Returns (count, seconds left)."""
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            entry = self._counters.get(key)
+            if entry is None or entry[1] <= now:
+                self._counters[key] = (1, now + ttl)
+                return 1, ttl
+            count = entry[0] + 1
+            self._counters[key] = (count, entry[1])
+            return count, max(0.0, entry[1] - now)
+
+
+class RedisBackend:
+    def __init__(self, url=None, client=None):
+        if client is None:
+            import redis  # optional: only needed when REDIS_URL is set
+            client = redis.Redis.from_url(url)
+        self._redis = client
+
+    def get(self, key):
+        return self._redis.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._redis.set(key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self._redis.delete(key)
+
+    def incr(self, key, ttl):
+        # SET NX EX creates the window with its expiry; INCR then counts in it.
+        # Both run in one MULTI so concurrent workers see a single window.
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.set(key, 0, ex=int(ttl), nx=True)
+        pipe.incr(key)
+        pipe.ttl(key)
+        _, count, remaining = pipe.execute()
+        return count, max(0, remaining)
+
+
+def backend_from_env():
+    return RedisBackend(REDIS_URL) if REDIS_URL else MemoryBackend()
+
+
+class Cache:
+    """JSON values under a namespace on a shared backend."""
+
+    def __init__(self, backend, namespace, ttl=None):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key):
+        return f"2bos:{self.namespace}:{key}"
+
+    def get(self, key):
+        raw = self.backend.get(self._key(key))
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(self._key(key), json.dumps(value), ttl or self.ttl)
+
+    def delete(self, key):
+        self.backend.delete(self._key(key))
+
+    def get_or_set(self, key, compute, ttl=None):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl)
+        return value
+
+
+class RateLimiter:
+    """Fixed-window limit: at most `limit` hits per `window` seconds per key."""
+
+    def __init__(self, backend, name, limit, window):
+        self.backend = backend
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def hit(self, key):
+        """Count one request. Returns (allowed, retry_after_seconds)."""
+        count, remaining = self.backend.incr(f"2bos:limit:{self.name}:{key}", self.window)
+        if count > self.limit:
+            return False, max(1, int(remaining + 0.999))
+        return True, 0
+
+
+backend = backend_from_env()
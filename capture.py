@@ -0,0 +1,64 @@
+import sys
+import threading
+from contextlib import contextmanager
+
+# Per-thread stdout capture for learner code.
+#
+# contextlib.redirect_stdout swaps sys.stdout for the whole process, so two
+# runs on the threadpool (or a server-side print) would write into each
+# other's buffers. Instead sys.stdout is replaced once by a proxy that writes
+# to the current thread's capture target, or to the real stream when the
+# thread isn't capturing anything.
+
+
+class _ThreadStdout:
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self):
+        target = getattr(self._local, "target", None)
+        return self._default if target is None else target
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+_install_lock = threading.Lock()
+
+
+def _proxy():
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadStdout):
+            sys.stdout = _ThreadStdout(sys.stdout)
+        return sys.stdout
+
+
+class Capture:
+    def __init__(self, target):
+        self.target = target
+        self.isolated = True  # False if the code replaced sys.stdout itself
+
+
+@contextmanager
+def capture_stdout(target):
+    """Send this thread's stdout to `target` for the duration of the block."""
+    proxy = _proxy()
+    capture = Capture(target)
+    previous = getattr(proxy._local, "target", None)
+    proxy._local.target = target
+    try:
+        yield capture
+    finally:
+        proxy._local.target = previous
+        if sys.stdout is not proxy:
+            # Something rebound sys.stdout mid-run; put the proxy back and
+            # don't trust what was captured
+            capture.isolated = False
+            sys.stdout = proxy
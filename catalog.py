@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import json
+import time
+
+from fastapi import Response
+
+import models
+
+try:
+    import orjson  # optional: faster encoder, same compact output
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # optional: without it only gzip is offered
+except ImportError:
+    brotli = None
+
+# Pre-serialized catalog for /projects/ and /projects/{id}.
+# Projects only change when seed.py runs, so each list and detail payload is
+# encoded once (JSON, gzip and, if available, brotli) and then served as bytes
+# with an ETag. Requests do no DB work, no encoding and no compression.
+#
+# Invalidation: seed.py calls bump_version(), which writes a new value under
+# VERSION_KEY in the cache backend. Every process compares it with the version
+# it built from (at most every `check_interval` seconds) and rebuilds when it
+# changed. The backend is only shared between processes when REDIS_URL is set;
+# without it each process still rebuilds once its copy is `max_age` old.
+
+VERSION_KEY = "2bos:catalog:version"
+
+
+def bump_version(backend):
+    """Tell every process serving the catalog to rebuild it from the DB."""
+    backend.set(VERSION_KEY, str(time.time_ns()))
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _accepted_encodings(header):
+    """Accept-Encoding -> {coding: q}, skipping anything with q=0."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if coding and q > 0:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class Payload:
+    """One JSON document with its compressed variants and ETag."""
+
+    __slots__ = ("body", "encoded", "etag")
+
+    def __init__(self, obj):
+        self.body = dumps(obj)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:20] + '"'
+        self.encoded = {"gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body, quality=11)
+        # Tiny documents (an empty list, null) don't get smaller; send them as-is
+        self.encoded = {k: v for k, v in self.encoded.items() if len(v) < len(self.body)}
+
+    def pick(self, accept_encoding):
+        accepted = _accepted_encodings(accept_encoding or "")
+        best = None
+        for coding in ("br", "gzip"):  # preferred first when q ties
+            q = accepted.get(coding, accepted.get("*", 0))
+            if coding in self.encoded and q > 0 and (best is None or q > best[1]):
+                best = (coding, q)
+        return best[0] if best else None
+
+    def response(self, request):
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if self.etag in if_none_match or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+        coding = self.pick(request.headers.get("accept-encoding"))
+        if coding is None:
+            return Response(self.body, media_type="application/json", headers=headers)
+        headers["Content-Encoding"] = coding
+        return Response(self.encoded[coding], media_type="application/json", headers=headers)
+
+
+class Catalog:
+    """
+    Project list (all and per difficulty) and project details as Payloads.
+
+    Built lazily from the DB on first use and rebuilt when the shared version
+    changes or the copy is older than `max_age`. `schema` is the response
+    model the payloads follow.
+    """
+
+    def __init__(self, session_factory, schema, backend, max_age=300, check_interval=5):
+        self._session_factory = session_factory
+        self._schema = schema
+        self._backend = backend
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._built = None  # (lists, details), swapped in as one reference
+        self._version = None
+        self._built_at = 0.0
+        self._next_check = 0.0
+        self._empty_list = Payload([])
+        self._missing = Payload(None)
+
+    def refresh(self, version=None):
+        if version is None:
+            version = self._backend.get(VERSION_KEY)
+        started = time.monotonic()
+        db = self._session_factory()
+        try:
+            projects = db.query(models.Project).order_by(models.Project.id).all()
+            docs = [self._schema.model_validate(p).model_dump(mode="json") for p in projects]
+        finally:
+            db.close()
+
+        by_level = {}
+        for doc in docs:
+            by_level.setdefault(doc["difficulty"], []).append(doc)
+        lists = {None: Payload(docs)}
+        lists.update({level: Payload(group) for level, group in by_level.items()})
+        details = {doc["id"]: Payload(doc) for doc in docs}
+        self._built = (lists, details)
+        self._version, self._built_at = version, started
+
+    def _ensure_loaded(self):
+        # Racing requests may both rebuild; the result is the same
+        now = time.monotonic()
+        if self._built is None:
+            self.refresh()
+        elif now >= self._next_check:
+            self._next_check = now + self.check_interval
+            version = self._backend.get(VERSION_KEY)
+            if version != self._version or now - self._built_at > self.max_age:
+                self.refresh(version)
+        return self._built
+
+    def projects(self, level=None):
+        lists, _ = self._ensure_loaded()
+        return lists.get(level or None, self._empty_list)
+
+    def project(self, project_id):
+        _, details = self._ensure_loaded()
+        return details.get(project_id, self._missing)
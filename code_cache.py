@@ -0,0 +1,126 @@
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Modules whose output only depends on the snippet itself. Anything else
+# (random, time, os, ...) makes a run uncacheable.
+PURE_MODULES = {
+    "abc", "bisect", "collections", "copy", "dataclasses", "decimal", "enum",
+    "fractions", "functools", "heapq", "itertools", "json", "math", "operator",
+    "re", "statistics", "string", "typing",
+}
+
+# Builtins that read input, touch the outside world or expose run-specific values
+IMPURE_BUILTINS = {
+    "input", "open", "id", "hash", "__import__", "eval", "exec", "compile",
+    "globals", "locals", "vars", "breakpoint", "help", "memoryview",
+}
+
+
+def source_key(source, filename="<string>"):
+    return hashlib.sha256(f"{filename}\0{source}".encode()).hexdigest()
+
+
+def is_deterministic(tree):
+    """True if the parsed snippet can't see anything that changes between runs."""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] not in PURE_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or (node.module or "").split(".")[0] not in PURE_MODULES:
+                return False
+        elif isinstance(node, ast.Name) and node.id in IMPURE_BUILTINS:
+            return False
+        elif isinstance(node, ast.Attribute) and node.attr.startswith("__") and node.attr != "__init__":
+            # Dunder access (__class__, __subclasses__, __globals__...) can reach anything
+            return False
+    return True
+
+
+class CompiledSnippet:
+    __slots__ = ("key", "code", "deterministic")
+
+    def __init__(self, key, code, deterministic):
+        self.key = key
+        self.code = code
+        self.deterministic = deterministic
+
+
+class _LRU:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CodeCache:
+    """
+    Two bounded LRU caches keyed by the SHA-256 of the source:
+      - compiled code objects (any snippet), so re-runs skip parse + compile
+      - captured output, only for snippets `is_deterministic` accepts
+    """
+
+    def __init__(self, max_compiled=512, max_outputs=512, max_output_chars=64 * 1024):
+        self.max_output_chars = max_output_chars
+        self._compiled = _LRU(max_compiled)
+        self._outputs = _LRU(max_outputs)
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source, filename="<string>"):
+        """Return a CompiledSnippet; raises SyntaxError like compile() on bad source."""
+        key = source_key(source, filename)
+        snippet = self._compiled.get(key)
+        if snippet is None:
+            tree = ast.parse(source, filename)
+            snippet = CompiledSnippet(key, compile(tree, filename, "exec"), is_deterministic(tree))
+            self._compiled.put(key, snippet)
+        return snippet
+
+    def get_output(self, snippet):
+        if not snippet.deterministic:
+            return None
+        output = self._outputs.get(snippet.key)
+        if output is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return output
+
+    def put_output(self, snippet, output):
+        if snippet.deterministic and len(output) <= self.max_output_chars:
+            self._outputs.put(snippet.key, output)
+
+    def stats(self):
+        return {
+            "compiled": len(self._compiled),
+            "outputs": len(self._outputs),
+            "output_hits": self.hits,
+            "output_misses": self.misses,
+        }
+
+
+code_cache = CodeCache()
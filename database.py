@@ -1,5 +1,5 @@
 # --- IMPORTS ---
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -21,4 +21,22 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create the Base class.
 # All our database models (tables) will inherit from this class.
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# Add columns that exist on the models but not yet in the database file.
+# create_all() only creates missing tables, so an older learning_platform.db
+# would otherwise fail on every query that touches a new column.
+def add_missing_columns(bind=engine):
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
@@ -0,0 +1,331 @@
+"""
+Offline evaluation of the judge: accuracy vs latency per model and prompt variant.
+
+Builds a labeled set from the seeded steps (run seed.py first), sends every
+case to each model through its OpenAI-compatible endpoint, and reports
+accuracy, the PASS/FAIL confusion matrix, tokens/sec and latency percentiles.
+
+    python eval_judge.py --model qwen2.5-coder:3b --model qwen2.5-coder:1.5b
+    python eval_judge.py --model qwen2.5-coder:3b@http://gpu-box:11434/v1 --variant default --variant strict
+    python eval_judge.py --write-dataset judge_cases.jsonl      # dump the set, edit labels, then:
+    python eval_judge.py --dataset judge_cases.jsonl --model qwen2.5-coder:3b --json results.json
+"""
+import argparse
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from openai import OpenAI
+
+import models
+import tutor
+from database import SessionLocal
+
+DEFAULT_BASE_URL = "http://localhost:11434/v1"
+
+# Learner messages that should never unlock code, whatever the step
+LAZY_MESSAGES = [
+    "Just give me the code.",
+    "I don't know, can you write it for me?",
+    "idk",
+]
+
+# How a learner might explain each seeded step in their own words (PASS cases).
+# Keyed by required_concept; steps not listed here just get no paraphrase case.
+PARAPHRASES = {
+    "Define a Class for the Node containing Title, Artist, and Next pointer.":
+        "each song is an object that stores its title and artist plus a link to the song after it",
+    "Define the Queue class with Head and Tail pointers.":
+        "the playlist keeps track of the first song and the last song, both empty at the start",
+    "Logic: Create node. If empty, head=tail=node. Else, tail.next=node and update tail.":
+        "make a new song; if nothing is queued it becomes both first and last, otherwise hook it after the last one and make it the new last",
+    "Logic: Save head data. Move head to head.next. Handle empty list case.":
+        "remember the first song, move the start to the one after it, and return nothing if the playlist is empty",
+    "Define a class to represent a single edit action (text content).":
+        "a small object that holds the text of one change",
+    "Define Editor class with two lists/stacks: history and future (redo).":
+        "the editor has two stacks, one for past states to undo and one for states we can redo",
+    "Write: Clear redo stack, push current to history. Undo: Pop history, push to redo.":
+        "typing saves the current text on the undo stack and wipes redo; undo takes the last saved text back and puts the current one on redo",
+    "Redo: Pop from future stack, push current to history, update text.":
+        "take the latest state off the redo stack, save what we have now on the undo stack, then switch to it",
+    "Use a Dictionary/Map to store ID -> LongURL mapping.":
+        "a hashmap from each numeric id to the original long url",
+    "Logic: Convert Integer ID to Base62 String using modulo and division loop.":
+        "keep taking the number mod 62 to pick a character and divide by 62 until it reaches zero",
+    "Public methods to save URL, generate ID, and retrieve URL by ID.":
+        "shorten stores the url under a new id and returns the code, and expand looks the code up to get the url back",
+    "Class User with ID and a Set/List of friends.":
+        "each user has an id and a collection of the users they are friends with",
+    "Use a Queue for BFS. Track 'visited' set. Find friends of friends (Level 2).":
+        "breadth first search from the user with a queue and a seen set, and suggest people who are two hops away",
+    "Node contains a Dictionary of children and an is_end_of_word boolean.":
+        "every node maps letters to child nodes and has a flag saying whether a word finishes there",
+    "Loop through characters. Create child node if not exists. Mark end.":
+        "walk the word letter by letter, adding a child when it's missing, and flag the last node as a word end",
+    "Traverse tree with prefix. If path exists, collect all words below that node.":
+        "follow the prefix letters down; if we get to the end, gather every word under that node",
+    "Class Directory with name and dictionary of children.":
+        "a folder object with a name and a map from names to its subfolders",
+    "Class FileSystem with root. Mkdir adds entry to current directory's children.":
+        "the file system starts at a root folder and mkdir puts a new folder into the current folder's map",
+    "Update 'current' pointer to the child node matching the name.":
+        "cd just moves our current folder reference to the subfolder with that name",
+    "Class Order with price, quantity, and comparison operators (__lt__) for the Heap.":
+        "an order stores price and amount and defines less-than so the heap can order them",
+    "Two lists: buy_heap and sell_heap. Use heapq to push/pop.":
+        "keep one heap for buy orders and one for sell orders using python's heapq",
+    "While loops: Check if Top Buy >= Top Sell. If yes, execute trade and reduce quantities.":
+        "keep matching while the best bid is at least the best ask, trading the smaller amount and lowering both",
+    "Node with Key, Value, Prev, and Next pointers.":
+        "each entry holds a key and value and links to the items before and after it",
+    "Map for lookups. Dummy head and Dummy tail nodes to simplify edge cases.":
+        "a hashmap for fast access plus fake start and end nodes so we never deal with empty-list cases",
+    "Helper methods: _remove(node) and _add_to_front(node).":
+        "two helpers, one to unlink a node and one to insert it right after the head",
+    "Get: Move to front. Put: Add to front. If full, remove tail.prev.":
+        "reading an item makes it most recent, adding puts it at the front, and when we're over capacity we drop the least recent one at the back",
+    "Adjacency List where edges have weights (distance).":
+        "for each place store its neighbours along with how far away they are",
+    "Priority Queue to track shortest distance found so far.":
+        "a min-heap ordered by distance so we always expand the closest unvisited node next",
+    "Count occurrences of each character.":
+        "go through the text and tally how many times each letter shows up",
+    "Node class. Heap logic: Pop two smallest, combine, push back.":
+        "repeatedly take the two lowest-frequency nodes off the heap, join them under a parent, and put the parent back",
+}
+
+
+# --- PROMPT VARIANTS ---
+def strict_prompt(step, message):
+    return f"""
+    You grade a student's explanation against a required concept.
+    Required concept: "{step.required_concept}"
+    Student: "{message}"
+
+    Answer PASS only if the student describes the same data structure or steps.
+    Requests for code, guesses, and unrelated explanations are FAIL.
+    Reply with exactly one word: PASS or FAIL.
+    """
+
+
+def fewshot_prompt(step, message):
+    return f"""
+    Role: Logic Examiner. Reply with one word, PASS or FAIL.
+
+    Example
+    Goal: "Use a Dictionary/Map to store ID -> LongURL mapping."
+    User: "a hashmap from the numeric id to the original url"
+    Verdict: PASS
+
+    Example
+    Goal: "Use a Dictionary/Map to store ID -> LongURL mapping."
+    User: "can you show me the code"
+    Verdict: FAIL
+
+    Goal: "{step.required_concept}"
+    User: "{message}"
+    Verdict:"""
+
+
+VARIANTS = {
+    "default": tutor.judge_prompt,  # what /chat/ uses
+    "strict": strict_prompt,
+    "fewshot": fewshot_prompt,
+}
+
+
+# --- DATASET ---
+def load_steps():
+    """Only the columns the judge sees, so an unmigrated DB works too."""
+    S = models.ProjectStep
+    db = SessionLocal()
+    try:
+        rows = db.query(S.id, S.project_id, S.step_order, S.title, S.required_concept).order_by(S.project_id, S.step_order).all()
+    finally:
+        db.close()
+    if not rows:
+        raise SystemExit("No project steps found. Run seed.py first.")
+    return rows
+
+
+def build_dataset(steps):
+    """
+    Per step: the concept itself and, for seeded steps, a paraphrase in a
+    learner's words (PASS); a lazy request and the concept of a different step
+    in the same project or, for single-step projects, another project (FAIL).
+    """
+    cases = []
+    for i, step in enumerate(steps):
+        concept = step.required_concept.strip()
+        base = {"project_id": step.project_id, "step_order": step.step_order}
+        cases.append({**base, "message": concept, "expected": "PASS", "kind": "concept"})
+        if concept in PARAPHRASES:
+            cases.append({**base, "message": PARAPHRASES[concept], "expected": "PASS", "kind": "paraphrase"})
+        cases.append({**base, "message": LAZY_MESSAGES[i % len(LAZY_MESSAGES)], "expected": "FAIL", "kind": "lazy"})
+
+        siblings = [s for s in steps if s.project_id == step.project_id and s.id != step.id]
+        other = siblings[i % len(siblings)] if siblings else steps[(i + len(steps) // 2) % len(steps)]
+        cases.append({**base, "message": other.required_concept.strip(), "expected": "FAIL", "kind": "wrong_step"})
+    return cases
+
+
+# --- RUNNING ---
+def parse_target(spec):
+    model, _, base_url = spec.partition("@")
+    return model, base_url or DEFAULT_BASE_URL
+
+
+def judge_once(client, model, prompt):
+    started = time.perf_counter()
+    try:
+        res = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": prompt}],
+            temperature=0.0, max_tokens=5
+        )
+        verdict = res.choices[0].message.content.strip().upper()
+        usage = res.usage
+        error = None
+    except Exception as e:
+        verdict, usage, error = "", None, str(e)
+    return {
+        "verdict": None if error else "PASS" if "PASS" in verdict else "FAIL",
+        "raw": verdict[:32],
+        "latency": time.perf_counter() - started,
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "error": error,
+    }
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def evaluate(model, base_url, variant, cases, steps, concurrency, warmup):
+    client = OpenAI(base_url=base_url, api_key="ollama")
+    prompt_fn = VARIANTS[variant]
+    prompts = [prompt_fn(steps[(c["project_id"], c["step_order"])], c["message"]) for c in cases]
+
+    for prompt in prompts[:warmup]:
+        judge_once(client, model, prompt)  # model load time shouldn't count against p95
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda p: judge_once(client, model, p), prompts))
+    wall = time.perf_counter() - started
+
+    # Errored calls are no prediction at all; scoring them as FAIL would make a
+    # dead endpoint look like a cautious judge
+    matrix = {"PASS": {"PASS": 0, "FAIL": 0}, "FAIL": {"PASS": 0, "FAIL": 0}}  # expected -> predicted
+    by_kind = {}
+    scored = [(c, r) for c, r in zip(cases, results) if r["error"] is None]
+    for case, result in scored:
+        matrix[case["expected"]][result["verdict"]] += 1
+        hit = by_kind.setdefault(case["kind"], [0, 0])
+        hit[0] += case["expected"] == result["verdict"]
+        hit[1] += 1
+
+    latencies = [r["latency"] for _, r in scored]
+    completion = sum(r["completion_tokens"] for r in results)
+    prompt_tokens = sum(r["prompt_tokens"] for r in results)
+    correct = matrix["PASS"]["PASS"] + matrix["FAIL"]["FAIL"]
+    return {
+        "model": model,
+        "base_url": base_url,
+        "variant": variant,
+        "cases": len(cases),
+        "scored": len(scored),
+        "accuracy": correct / len(scored) if scored else None,
+        # A false PASS hands out code the learner didn't earn; track it on its own
+        "false_pass_rate": matrix["FAIL"]["PASS"] / sum(matrix["FAIL"].values()) if sum(matrix["FAIL"].values()) else None,
+        "confusion": matrix,
+        "accuracy_by_kind": {k: round(v[0] / v[1], 3) for k, v in by_kind.items()},
+        "errors": len(cases) - len(scored),
+        "error_samples": sorted({r["error"] for r in results if r["error"]})[:3],
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "tokens_per_sec": (prompt_tokens + completion) / wall if wall else 0.0,  # aggregate, prompt included
+        "completion_tokens_per_sec": completion / sum(latencies) if latencies else 0.0,  # per request stream
+        "throughput_rps": len(scored) / wall if wall else 0.0,
+    }
+
+
+def _pct(value, width):
+    return f"{'n/a':>{width}}" if value is None else f"{value:>{width}.1%}"
+
+
+def print_report(reports):
+    header = f"{'model':<28}{'variant':<10}{'acc':>7}{'falsePASS':>10}{'p50 s':>8}{'p95 s':>8}{'tok/s':>9}{'req/s':>8}{'err':>5}"
+    print(header)
+    print("-" * len(header))
+    for r in reports:
+        print(f"{r['model'][:27]:<28}{r['variant']:<10}{_pct(r['accuracy'], 7)}{_pct(r['false_pass_rate'], 10)}"
+              f"{r['latency_p50']:>8.2f}{r['latency_p95']:>8.2f}{r['tokens_per_sec']:>9.1f}{r['throughput_rps']:>8.2f}{r['errors']:>5}")
+    for r in reports:
+        m = r["confusion"]
+        print(f"\n{r['model']} / {r['variant']}  (rows: expected, cols: predicted)")
+        print(f"{'':>10}{'PASS':>8}{'FAIL':>8}")
+        for expected in ("PASS", "FAIL"):
+            print(f"{expected:>10}{m[expected]['PASS']:>8}{m[expected]['FAIL']:>8}")
+        print("by kind: " + ", ".join(f"{k} {v:.0%}" for k, v in r["accuracy_by_kind"].items()))
+        if r["errors"]:
+            print(f"errors: {r['errors']} of {r['cases']} calls failed and are left out of the scores above")
+            for error in r["error_samples"]:
+                print(f"  {error[:160]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", action="append", default=[], help="MODEL or MODEL@BASE_URL (repeatable)")
+    parser.add_argument("--variant", action="append", choices=sorted(VARIANTS), help="prompt variant (repeatable, default: default)")
+    parser.add_argument("--dataset", help="JSONL of cases to use instead of building one from the DB")
+    parser.add_argument("--write-dataset", help="write the built dataset to this JSONL file and exit")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests per model/variant before measuring")
+    parser.add_argument("--limit", type=int, help="only use the first N cases")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    step_rows = load_steps()
+    if args.dataset:
+        with open(args.dataset) as f:
+            cases = [json.loads(line) for line in f if line.strip()]
+    else:
+        cases = build_dataset(step_rows)
+    if args.limit:
+        cases = cases[:args.limit]
+
+    if args.write_dataset:
+        with open(args.write_dataset, "w") as f:
+            for case in cases:
+                f.write(json.dumps(case) + "\n")
+        print(f"Wrote {len(cases)} cases to {args.write_dataset}")
+        return
+
+    steps = {(s.project_id, s.step_order): s for s in step_rows}
+    missing = {(c["project_id"], c["step_order"]) for c in cases} - steps.keys()
+    if missing:
+        raise SystemExit(f"Dataset refers to steps not in the DB: {sorted(missing)}")
+
+    targets = [parse_target(m) for m in (args.model or [tutor.MODEL])]
+    reports = []
+    for model, base_url in targets:
+        for variant in args.variant or ["default"]:
+            print(f"Evaluating {model} ({variant}) on {len(cases)} cases...")
+            reports.append(evaluate(model, base_url, variant, cases, steps, args.concurrency, args.warmup))
+
+    print()
+    print_report(reports)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
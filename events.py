@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+import models
+
+
+class EventLog:
+    """
+    Write-behind log for chat turns.
+
+    `record` only drops a dict on a queue; a background thread drains it and
+    inserts rows into `chat_events` in batches, so the request never waits on
+    SQLite. If the queue is full (DB stalled) events are dropped and counted
+    rather than slowing down `/chat/`.
+    """
+
+    _STOP = object()
+
+    def __init__(self, session_factory, batch_size=100, flush_interval=1.0, max_queue=10000):
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+
+    def record(self, **fields):
+        self._ensure_started()
+        fields.setdefault("created_at", datetime.utcnow())
+        try:
+            self._queue.put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-event-log", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout=5.0):
+        """Flush whatever is queued and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- WRITER THREAD ---
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is self._STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+
+            # Flush on a full batch, or once the oldest queued event is flush_interval old
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        db = self._session_factory()
+        try:
+            db.execute(insert(models.ChatEvent), batch)
+            db.commit()
+            self.written += len(batch)
+        except Exception as e:
+            db.rollback()
+            self.dropped += len(batch)
+            print(f"Event log flush failed ({len(batch)} events dropped): {e}")
+        finally:
+            db.close()
@@ -0,0 +1,125 @@
+import io
+import time
+import traceback
+
+from capture import capture_stdout
+from code_cache import code_cache
+
+# Step test harness.
+#
+# A ProjectStep can carry two optional snippets (see seed.py):
+#   test_code      -> defines test_* functions that assert against the learner's classes
+#   benchmark_code -> defines bench(n) (and optionally BENCH_OPS) to time n operations
+# Both run in the same namespace as the learner's assembled code. "passed" is
+# None for steps without tests, False if the code or any test failed.
+
+DEFAULT_BENCH_OPS = 10000
+
+# step id -> ops/sec of the reference solution (unlock_code), measured once per process
+_reference_cache = {}
+
+
+class _Discard(io.TextIOBase):
+    # Benchmarks call methods that print on every operation; don't buffer all of that
+    def write(self, s):
+        return len(s)
+
+
+def assemble_code(steps, step_order, user_code):
+    """Prior steps' unlock_code followed by the learner's code for this step."""
+    prior = [s.unlock_code for s in steps if s.step_order < step_order and s.unlock_code]
+    return "\n".join(prior + [user_code])
+
+
+def reference_code(steps, step_order):
+    return "\n".join(s.unlock_code for s in steps if s.step_order <= step_order and s.unlock_code)
+
+
+def _new_namespace():
+    return {"__builtins__": __builtins__, "__name__": "__main__"}
+
+
+def _run_tests(namespace, test_code):
+    results = []
+    exec(code_cache.compile(test_code, "<step tests>").code, namespace)
+    tests = [(name, fn) for name, fn in namespace.items() if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        started = time.perf_counter()
+        try:
+            fn()
+            results.append({"name": name, "passed": True, "error": None})
+        except AssertionError as e:
+            results.append({"name": name, "passed": False, "error": str(e) or "Assertion failed"})
+        except Exception:
+            results.append({"name": name, "passed": False, "error": traceback.format_exc(limit=-1).strip()})
+        results[-1]["ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return results
+
+
+def _run_benchmark(namespace, benchmark_code):
+    exec(code_cache.compile(benchmark_code, "<step benchmark>").code, namespace)
+    ops = namespace.get("BENCH_OPS", DEFAULT_BENCH_OPS)
+    with capture_stdout(_Discard()):
+        started = time.perf_counter()
+        namespace["bench"](ops)
+        elapsed = time.perf_counter() - started
+    return {"ops": ops, "seconds": round(elapsed, 6), "ops_per_sec": round(ops / elapsed, 1) if elapsed else None}
+
+
+def reference_ops_per_sec(step, steps):
+    if step.id in _reference_cache:
+        return _reference_cache[step.id]
+    try:
+        namespace = _new_namespace()
+        with capture_stdout(_Discard()):
+            exec(code_cache.compile(reference_code(steps, step.step_order), "<reference>").code, namespace)
+        result = _run_benchmark(namespace, step.benchmark_code)["ops_per_sec"]
+    except Exception:
+        result = None  # A broken reference shouldn't fail the learner's run
+    _reference_cache[step.id] = result
+    return result
+
+
+def run_step(step, steps, user_code):
+    """Run the learner's assembled code, then the step's tests and benchmark against it."""
+    result = {"output": "", "passed": False, "tests": [], "benchmark": None, "timing": {}}
+    namespace = _new_namespace()
+    buffer = io.StringIO()
+
+    started = time.perf_counter()
+    try:
+        with capture_stdout(buffer):
+            exec(code_cache.compile(assemble_code(steps, step.step_order, user_code), "<learner>").code, namespace)
+    except Exception:
+        result["output"] = buffer.getvalue() + traceback.format_exc()
+        result["timing"]["run_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+    result["timing"]["run_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    if step.test_code:
+        started = time.perf_counter()
+        try:
+            with capture_stdout(buffer):
+                result["tests"] = _run_tests(namespace, step.test_code)
+        except Exception:
+            result["tests"] = [{"name": "<setup>", "passed": False, "error": traceback.format_exc(limit=-1).strip(), "ms": 0}]
+        result["timing"]["tests_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    result["output"] = buffer.getvalue() or "Code Executed."
+    # None, not True, when the step has no tests: nothing was checked
+    result["passed"] = all(t["passed"] for t in result["tests"]) if result["tests"] else None
+
+    if step.benchmark_code and result["passed"] is not False:
+        try:
+            bench = _run_benchmark(namespace, step.benchmark_code)
+        except Exception:
+            bench = {"error": traceback.format_exc(limit=-1).strip()}
+        else:
+            reference = reference_ops_per_sec(step, steps)
+            bench["reference_ops_per_sec"] = reference
+            bench["relative_to_reference"] = (
+                round(bench["ops_per_sec"] / reference, 3) if reference and bench["ops_per_sec"] else None
+            )
+        result["benchmark"] = bench
+
+    return result
@@ -0,0 +1,260 @@
+import bisect
+import os
+import threading
+import time
+
+import models
+
+UNASSIGNED_LEVEL = "Unassigned"
+# Seconds before the snapshot is rebuilt from the DB. Picks up progress made in
+# other uvicorn workers and edits made outside the app (seed, manual fixes).
+LEADERBOARD_MAX_AGE = float(os.environ.get("LEADERBOARD_MAX_AGE", "30"))
+
+
+class RankIndex:
+    """Scores kept in a sorted list so rank and page lookups are a bisect, not a scan."""
+
+    def __init__(self):
+        self._keys = []    # sorted (-score, user_id): highest score first, ties by user id
+        self._scores = {}  # user_id -> score
+        self.total = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def items(self):
+        return self._scores.items()
+
+    def set(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._discard(user_id, old)
+        bisect.insort(self._keys, (-score, user_id))
+        self._scores[user_id] = score
+        self.total += score
+
+    def remove(self, user_id):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._discard(user_id, old)
+
+    def _discard(self, user_id, score):
+        i = bisect.bisect_left(self._keys, (-score, user_id))
+        del self._keys[i]
+        self.total -= score
+
+    def rank(self, user_id):
+        # Competition ranking: tied scores share a rank ("1, 2, 2, 4").
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._rank_of_score(score)
+
+    def _rank_of_score(self, score):
+        return bisect.bisect_left(self._keys, (-score,)) + 1
+
+    def page(self, offset=0, limit=10):
+        return [
+            {"rank": self._rank_of_score(-neg), "user_id": uid, "completed_steps": -neg}
+            for neg, uid in self._keys[offset:offset + limit]
+        ]
+
+
+class Leaderboard:
+    """
+    In-memory ranking of learners by completed steps, per project and globally.
+
+    Built from the DB on first use and rebuilt once it is older than `max_age`
+    seconds. In between, `record_progress` / `set_level` calls from the routes
+    that change progress keep this process's copy current.
+    """
+
+    def __init__(self, session_factory, max_age=LEADERBOARD_MAX_AGE):
+        self._session_factory = session_factory
+        self.max_age = max_age
+        self._lock = threading.RLock()           # guards the indexes; only ever held briefly
+        self._refresh_lock = threading.Lock()    # one rebuild at a time
+        self._loaded_at = None  # monotonic time of the last refresh
+        self._journal = None    # updates seen while a rebuild is reading the DB
+        self._reset()
+
+    def _reset(self):
+        self._global = RankIndex()
+        self._projects = {}   # project_id -> RankIndex
+        self._cohorts = {}    # proficiency_level -> RankIndex of global scores
+        self._levels = {}     # user_id -> proficiency_level
+
+    # --- LOADING ---
+    def refresh(self):
+        with self._refresh_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        # The DB scan and index build run without _lock, so readers and
+        # record_progress (called on the event loop) never wait for them.
+        # Updates that land meanwhile are journaled and replayed on the new
+        # indexes; both kinds of update are idempotent.
+        with self._lock:
+            self._journal = []
+        try:
+            db = self._session_factory()
+            try:
+                rows = db.query(
+                    models.UserProgress.user_id,
+                    models.UserProgress.project_id,
+                    models.UserProgress.current_step_order,
+                ).all()
+                users = db.query(models.User.id, models.User.proficiency_level).all()
+            finally:
+                db.close()
+
+            levels = {uid: level or UNASSIGNED_LEVEL for uid, level in users}
+            global_index, projects, cohorts = RankIndex(), {}, {}
+
+            completed = {}
+            for user_id, project_id, step_order in rows:
+                done = max(0, (step_order or 1) - 1)
+                # Keep the furthest row if a learner somehow has duplicates
+                key = (user_id, project_id)
+                completed[key] = max(done, completed.get(key, 0))
+
+            totals = {}
+            for (user_id, project_id), done in completed.items():
+                projects.setdefault(project_id, RankIndex()).set(user_id, done)
+                totals[user_id] = totals.get(user_id, 0) + done
+
+            for user_id, total in totals.items():
+                global_index.set(user_id, total)
+                cohorts.setdefault(levels.get(user_id, UNASSIGNED_LEVEL), RankIndex()).set(user_id, total)
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            self._global, self._projects, self._cohorts, self._levels = global_index, projects, cohorts, levels
+            journal, self._journal = self._journal, None
+            for apply, args in journal:
+                apply(*args)
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None:
+            self.refresh()  # nothing to serve yet: wait for the first build
+        elif time.monotonic() - self._loaded_at > self.max_age and self._refresh_lock.acquire(blocking=False):
+            # Stale: this caller rebuilds, everyone else keeps reading the old indexes
+            try:
+                self._rebuild()
+            finally:
+                self._refresh_lock.release()
+
+    def _project_index(self, project_id):
+        index = self._projects.get(project_id)
+        if index is None:
+            index = self._projects[project_id] = RankIndex()
+        return index
+
+    def _cohort_index(self, level):
+        index = self._cohorts.get(level)
+        if index is None:
+            index = self._cohorts[level] = RankIndex()
+        return index
+
+    def _level_of(self, user_id):
+        return self._levels.get(user_id, UNASSIGNED_LEVEL)
+
+    # --- UPDATES ---
+    def record_progress(self, user_id, project_id, completed_steps):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((self._apply_progress, (user_id, project_id, completed_steps)))
+            if self._loaded_at is not None:
+                self._apply_progress(user_id, project_id, completed_steps)
+            # else: the first refresh reads it from the DB (or replays it)
+
+    def _apply_progress(self, user_id, project_id, completed_steps):
+        index = self._project_index(project_id)
+        delta = completed_steps - (index.score(user_id) or 0)
+        index.set(user_id, completed_steps)
+
+        total = (self._global.score(user_id) or 0) + delta
+        self._global.set(user_id, total)
+        self._cohort_index(self._level_of(user_id)).set(user_id, total)
+
+    def set_level(self, user_id, level):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((self._apply_level, (user_id, level)))
+            if self._loaded_at is not None:
+                self._apply_level(user_id, level)
+
+    def _apply_level(self, user_id, level):
+        level = level or UNASSIGNED_LEVEL
+        old = self._level_of(user_id)
+        self._levels[user_id] = level
+        total = self._global.score(user_id)
+        if total is None or old == level:
+            return
+        self._cohort_index(old).remove(user_id)
+        self._cohort_index(level).set(user_id, total)
+
+    # --- QUERIES ---
+    def top(self, project_id=None, offset=0, limit=10):
+        self._ensure_loaded()
+        with self._lock:
+            index = self._global if project_id is None else self._projects.get(project_id, RankIndex())
+            return {
+                "project_id": project_id,
+                "total": len(index),
+                "offset": offset,
+                "entries": index.page(offset, limit),
+            }
+
+    def rank_of(self, user_id, project_id=None):
+        self._ensure_loaded()
+        with self._lock:
+            index = self._global if project_id is None else self._projects.get(project_id, RankIndex())
+            rank = index.rank(user_id)
+            if rank is None:
+                return None
+            level = self._level_of(user_id)
+            return {
+                "user_id": user_id,
+                "project_id": project_id,
+                "rank": rank,
+                "total": len(index),
+                "completed_steps": index.score(user_id),
+                "proficiency_level": level,
+                "cohort_rank": self._cohort_index(level).rank(user_id) if project_id is None else None,
+            }
+
+    def cohorts(self, project_id=None):
+        self._ensure_loaded()
+        with self._lock:
+            if project_id is None:
+                groups = {level: (len(ix), ix.total, ix.page(0, 1)) for level, ix in self._cohorts.items() if len(ix)}
+            else:
+                # Per-project breakdowns are rare; a pass over one project's learners is fine
+                buckets = {}
+                for user_id, done in self._projects.get(project_id, RankIndex()).items():
+                    buckets.setdefault(self._level_of(user_id), RankIndex()).set(user_id, done)
+                groups = {level: (len(ix), ix.total, ix.page(0, 1)) for level, ix in buckets.items()}
+
+            return [
+                {
+                    "proficiency_level": level,
+                    "learners": learners,
+                    "completed_steps": total,
+                    "average_completed": round(total / learners, 2) if learners else 0,
+                    "leader": leader[0] if leader else None,
+                }
+                for level, (learners, total, leader) in sorted(groups.items())
+            ]
@@ -1,31 +1,48 @@
 import os
 import sys
-import io
-import traceback
+import asyncio
+import time
 from datetime import datetime, timedelta
-from contextlib import redirect_stdout
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import closing
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
-from openai import OpenAI 
 from passlib.context import CryptContext # Security
 from jose import JWTError, jwt # Tokens
-import re
 
 import models
-from database import engine, SessionLocal
+from database import engine, SessionLocal, add_missing_columns
+from leaderboard import Leaderboard
+from events import EventLog
+import harness
+import progress as progress_store
+import tutor
+from runners import get_runner, RUNNERS
+from workspace import WorkspaceSession, call_streaming
+from cache import RateLimiter, backend as cache_backend
+from catalog import Catalog
+from admission import Overloaded
 
 # --- SETUP ---
 models.Base.metadata.create_all(bind=engine)
+add_missing_columns(engine)
+progress_store.ensure_unique_index(engine)
 
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
 
-client = OpenAI(base_url="http://localhost:11434/v1", api_key="ollama")
+leaderboard = Leaderboard(SessionLocal)
+event_log = EventLog(SessionLocal)
+
+# Backed by Redis when REDIS_URL is set, so every uvicorn worker shares them
+chat_limiter = RateLimiter(cache_backend, "chat", limit=20, window=60)
+run_limiter = RateLimiter(cache_backend, "run", limit=60, window=60)
 app = FastAPI()
 
 app.add_middleware(
@@ -36,9 +53,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(Overloaded)
+def overloaded_handler(request: Request, exc: Overloaded):
+    # Shed load instead of letting the queue in front of the model grow
+    return JSONResponse(status_code=429, content={"detail": exc.reason},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    event_log.close()
+    RUNNERS["java"].close()
+
 # --- SECURITY CONFIG ---
 SECRET_KEY = "YOUR_SUPER_SECRET_KEY_HERE" # In prod, use .env
 ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
@@ -47,6 +76,16 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def create_access_token(user_id):
+    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return jwt.encode({"sub": str(user_id), "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_access_token(token):
+    try:
+        return int(jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["sub"])
+    except (JWTError, KeyError, ValueError):
+        return None
+
 # --- DATA MODELS ---
 class AuthRequest(BaseModel):
     email: str
@@ -59,6 +98,10 @@ class ChatRequest(BaseModel):
 
 class CodeExecutionRequest(BaseModel):
     code: str
+    language: str = "python"
+    user_id: Optional[int] = None
+    project_id: Optional[int] = None
+    step_order: Optional[int] = None
 
 class ProficiencyRequest(BaseModel):
     user_id: int
@@ -68,9 +111,80 @@ class InitProjectRequest(BaseModel):
     user_id: int
     project_id: int
 
+# --- RESPONSE MODELS ---
+# With a response model FastAPI validates and serializes the result with
+# Pydantic straight to JSON bytes instead of walking it with jsonable_encoder.
+class AuthResponse(BaseModel):
+    id: int
+    email: str
+    proficiency_level: Optional[str] = None
+    access_token: str
+
+class StatusResponse(BaseModel):
+    status: str
+
+class DashboardProject(BaseModel):
+    id: int
+    title: str
+    difficulty: Optional[str] = None
+    description: Optional[str] = None
+    current_step: int
+    total_steps: int
+    percent: int
+
+class DashboardResponse(BaseModel):
+    global_progress: int
+    projects: list[DashboardProject]
+
+class ProjectOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    title: str
+    difficulty: Optional[str] = None
+    description: Optional[str] = None
+    full_solution_context: Optional[str] = None
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    completed_steps: int
+
+class LeaderboardPage(BaseModel):
+    project_id: Optional[int] = None
+    total: int
+    offset: int
+    entries: list[LeaderboardEntry]
+
+class UserRank(BaseModel):
+    user_id: int
+    project_id: Optional[int] = None
+    rank: int
+    total: int
+    completed_steps: int
+    proficiency_level: str
+    cohort_rank: Optional[int] = None
+
+class Cohort(BaseModel):
+    proficiency_level: str
+    learners: int
+    completed_steps: int
+    average_completed: float
+    leader: Optional[LeaderboardEntry] = None
+
+class CohortsResponse(BaseModel):
+    project_id: Optional[int] = None
+    cohorts: list[Cohort]
+
+class ChatResponse(BaseModel):
+    reply: str
+
+# Static catalog: serialized and compressed once, served as bytes. Rebuilt
+# when seed.py bumps the version in the shared cache backend (see catalog.py)
+catalog = Catalog(SessionLocal, ProjectOut, cache_backend)
+
 # --- AUTH ROUTES ---
 
-@app.post("/register/")
+@app.post("/register/", response_model=AuthResponse)
 def register(user: AuthRequest, db: Session = Depends(get_db)):
     # 1. Check if email exists
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
@@ -84,9 +198,10 @@ def register(user: AuthRequest, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(new_user)
     
-    return {"id": new_user.id, "email": new_user.email, "proficiency_level": None}
+    return {"id": new_user.id, "email": new_user.email, "proficiency_level": None,
+            "access_token": create_access_token(new_user.id)}
 
-@app.post("/login/")
+@app.post("/login/", response_model=AuthResponse)
 def login(user: AuthRequest, db: Session = Depends(get_db)):
     # 1. Find User
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
@@ -97,32 +212,29 @@ def login(user: AuthRequest, db: Session = Depends(get_db)):
     if not verify_password(user.password, db_user.hashed_password):
         raise HTTPException(status_code=400, detail="Invalid Password")
     
-    return {"id": db_user.id, "email": db_user.email, "proficiency_level": db_user.proficiency_level}
+    return {"id": db_user.id, "email": db_user.email, "proficiency_level": db_user.proficiency_level,
+            "access_token": create_access_token(db_user.id)}
 
-@app.post("/update-proficiency/")
+@app.post("/update-proficiency/", response_model=StatusResponse)
 def update_proficiency(data: ProficiencyRequest, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.id == data.user_id).first()
     if not user: raise HTTPException(status_code=404, detail="User not found")
     user.proficiency_level = data.proficiency
     db.commit()
+    leaderboard.set_level(user.id, data.proficiency)
     return {"status": "success"}
 
 # --- PROJECT ROUTES ---
-@app.post("/projects/initialize")
+@app.post("/projects/initialize", response_model=StatusResponse)
 def initialize_project(req: InitProjectRequest, db: Session = Depends(get_db)):
-    progress = db.query(models.UserProgress).filter(
-        models.UserProgress.user_id == req.user_id,
-        models.UserProgress.project_id == req.project_id
-    ).first()
+    progress, created = progress_store.get_or_create(db, req.user_id, req.project_id)
     
-    if not progress:
-        progress = models.UserProgress(user_id=req.user_id, project_id=req.project_id, current_step_order=1)
-        db.add(progress)
-        db.commit()
+    if created:
+        leaderboard.record_progress(req.user_id, req.project_id, 0)
         return {"status": "Started"}
     return {"status": "Resumed"}
 
-@app.get("/user/{user_id}/dashboard")
+@app.get("/user/{user_id}/dashboard", response_model=DashboardResponse)
 def get_user_dashboard(user_id: int, db: Session = Depends(get_db)):
     all_projects = db.query(models.Project).all()
     total_possible_steps = sum([len(p.steps) for p in all_projects]) if all_projects else 1
@@ -156,43 +268,98 @@ def get_user_dashboard(user_id: int, db: Session = Depends(get_db)):
         
     return {"global_progress": global_percentage, "projects": dashboard_data}
 
-@app.get("/projects/")
-def get_projects(level: Optional[str] = None, db: Session = Depends(get_db)):
-    if level:
-        return db.query(models.Project).filter(models.Project.difficulty == level).all()
-    return db.query(models.Project).all()
+# Both return pre-encoded bytes (gzip/br per Accept-Encoding, 304 on a matching
+# If-None-Match); the response models only document the shape.
+@app.get("/projects/", response_model=list[ProjectOut])
+def get_projects(request: Request, level: Optional[str] = None):
+    return catalog.projects(level).response(request)
 
-@app.get("/projects/{project_id}")
-def get_project_details(project_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Project).filter(models.Project.id == project_id).first()
+@app.get("/projects/{project_id}", response_model=Optional[ProjectOut])
+def get_project_details(project_id: int, request: Request):
+    return catalog.project(project_id).response(request)
+
+# --- LEADERBOARD ROUTES ---
+@app.get("/leaderboard/", response_model=LeaderboardPage)
+def get_leaderboard(project_id: Optional[int] = None,
+                    offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=100)):
+    return leaderboard.top(project_id, offset, limit)
+
+@app.get("/leaderboard/cohorts", response_model=CohortsResponse)
+def get_cohorts(project_id: Optional[int] = None):
+    return {"project_id": project_id, "cohorts": leaderboard.cohorts(project_id)}
+
+@app.get("/leaderboard/{user_id}", response_model=UserRank)
+def get_user_rank(user_id: int, project_id: Optional[int] = None):
+    entry = leaderboard.rank_of(user_id, project_id)
+    if not entry: raise HTTPException(status_code=404, detail="User has no ranked progress")
+    return entry
 
 # --- EXECUTION & CHAT (Unchanged Logic, just cleaner) ---
+def client_key(http_request: Request):
+    """
+    Who a quota or fair-share slot belongs to: the user in the bearer token,
+    else the client address. Never the user_id in the body, which anyone can set.
+    """
+    scheme, _, token = http_request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer":
+        user_id = decode_access_token(token.strip())
+        if user_id is not None:
+            return user_id  # same key the workspace socket uses
+    host = http_request.client.host if http_request.client else None
+    return f"ip:{host or 'unknown'}"
+
+def enforce_limit(limiter, key):
+    allowed, retry_after = limiter.hit(key)
+    if not allowed:
+        raise HTTPException(status_code=429, detail="Too many requests. Slow down a little.",
+                            headers={"Retry-After": str(retry_after)})
+
 @app.post("/run/")
-def run_code(request: CodeExecutionRequest):
-    buffer = io.StringIO()
-    try:
-        with redirect_stdout(buffer):
-            exec(request.code, {"__builtins__": __builtins__}, {})
-        return {"output": buffer.getvalue() or "Code Executed."}
-    except Exception:
-        return {"output": traceback.format_exc()}
-
-@app.post("/chat/")
-def chat_with_ai(request: ChatRequest, db: Session = Depends(get_db)):
+def run_code(request: CodeExecutionRequest, http_request: Request, db: Session = Depends(get_db)):
+    enforce_limit(run_limiter, client_key(http_request))
+    runner = get_runner(request.language)
+    if not runner: raise HTTPException(status_code=400, detail=f"Unsupported language: {request.language}")
+
+    if request.project_id is not None and request.step_order is not None:
+        if runner.language != "python":
+            raise HTTPException(status_code=400, detail="Step tests are only available for Python")
+        return run_step_tests(request, db)
+
+    return runner.run(request.code)
+
+def run_step_tests(request: CodeExecutionRequest, db: Session):
+    steps = db.query(models.ProjectStep).filter(
+        models.ProjectStep.project_id == request.project_id
+    ).order_by(models.ProjectStep.step_order).all()
+
+    step = next((s for s in steps if s.step_order == request.step_order), None)
+    if not step: raise HTTPException(status_code=404, detail="Step not found")
+
+    return harness.run_step(step, steps, request.code)
+
+def log_chat_turn(user_id, project_id, step_order, verdict, started, judge_ms, tutor_ms, usage):
+    event_log.record(
+        user_id=user_id, project_id=project_id, step_order=step_order,
+        verdict="PASS" if "PASS" in verdict else "FAIL", raw_verdict=verdict[:32],
+        judge_ms=judge_ms, tutor_ms=tutor_ms, total_ms=(time.perf_counter() - started) * 1000,
+        **usage
+    )
+
+@app.post("/chat/", response_model=ChatResponse)
+def chat_with_ai(request: ChatRequest, http_request: Request, db: Session = Depends(get_db)):
+    caller = client_key(http_request)
+    enforce_limit(chat_limiter, caller)
+    started = time.perf_counter()
     project = db.query(models.Project).filter(models.Project.id == request.project_id).first()
     user = db.query(models.User).filter(models.User.id == request.user_id).first()
     
     if not project or not user: return {"reply": "Error: Context missing."}
 
-    progress = db.query(models.UserProgress).filter(
-        models.UserProgress.user_id == request.user_id,
-        models.UserProgress.project_id == request.project_id
-    ).first()
-
-    if not progress:
-        progress = models.UserProgress(user_id=request.user_id, project_id=request.project_id, current_step_order=1)
-        db.add(progress)
-        db.commit()
+    progress, created = progress_store.get_or_create(db, request.user_id, request.project_id)
+    if created:
+        leaderboard.record_progress(request.user_id, request.project_id, 0)
+    # What this turn is judging; the advance below only applies if it still holds
+    expected_step, expected_version = progress.current_step_order, progress.version
 
     current_step = db.query(models.ProjectStep).filter(
         models.ProjectStep.project_id == request.project_id,
@@ -200,84 +367,175 @@ def chat_with_ai(request: ChatRequest, db: Session = Depends(get_db)):
     ).first()
 
     if not current_step:
-        return {"reply": "CONGRATULATIONS! You have completed all steps. Feel free to experiment."}
+        return {"reply": tutor.COMPLETED_REPLY}
 
     print(f"User Level: {user.proficiency_level} | Step: {current_step.title}")
 
     # --- JUDGE ---
-    judge_prompt = f"""
-    Role: Logic Examiner.
-    Goal: "{current_step.required_concept}"
-    User Input: "{request.message}"
-    
-    Did the user correctly explain the logic/variables?
-    OUTPUT ONLY: PASS or FAIL
-    """
-
-    try:
-        judge_res = client.chat.completions.create(
-            model="qwen2.5-coder:3b", 
-            messages=[{"role": "system", "content": judge_prompt}],
-            temperature=0.0, max_tokens=5
-        )
-        verdict = judge_res.choices[0].message.content.strip().upper()
-    except: verdict = "FAIL"
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    judge_started = time.perf_counter()
+    verdict = tutor.judge(current_step, request.message, usage, caller)
+    judge_ms = (time.perf_counter() - judge_started) * 1000
 
     if "PASS" in verdict:
-        # SUCCESS
-        code_reward = current_step.unlock_code
-        progress.current_step_order += 1
-        db.commit()
+        # SUCCESS (a concurrent PASS for the same step may have advanced it already)
+        if progress_store.advance(db, progress.id, expected_step, expected_version):
+            leaderboard.record_progress(request.user_id, request.project_id, expected_step)
+        db.refresh(progress)
         
         next_step = db.query(models.ProjectStep).filter(
             models.ProjectStep.project_id == request.project_id,
             models.ProjectStep.step_order == progress.current_step_order
         ).first()
         
-        next_text = f"Next Goal: {next_step.title}." if next_step else "Project Complete!"
-        return {"reply": f"**Correct!**\n\nHere is the implementation:\n```python\n{code_reward}\n```\n\n{next_text}"}
+        log_chat_turn(request.user_id, request.project_id, current_step.step_order, verdict, started, judge_ms, None, usage)
+        return {"reply": tutor.reward_reply(current_step, next_step)}
 
     else:
         # --- TUTOR MODE (Simplified) ---
-        level = user.proficiency_level or "Beginner"
+        tutor_started = time.perf_counter()
+        ai_reply = tutor.tutor(user.proficiency_level, project.title, current_step, request.message, usage, caller)
+        tutor_ms = (time.perf_counter() - tutor_started) * 1000
         
-        if level == "Beginner":
-            persona = "You are a patient teacher. Use analogies."
-        elif level == "Advanced":
-            persona = "You are a Lead Architect. Be concise and technical."
-        else:
-            persona = "You are a Senior Developer. Be direct."
-
-        # We give it an EXAMPLE of a good response to follow
-        tutor_prompt = f"""
-        {persona}
-        Context: Project "{project.title}".
-        Goal: Help user with "{current_step.required_concept}" without giving code.
-        
-        User: "{request.message}"
-        
-        Your Response Guidelines:
-        1. Explain the concept briefly.
-        2. Ask a specific question to guide them.
-        3. NO headers. NO meta-talk.
-        """
-        
-        completion = client.chat.completions.create(
-            model="qwen2.5-coder:3b", 
-            messages=[{"role": "system", "content": tutor_prompt}],
-            temperature=0.3, max_tokens=350
-        )
-        
-        ai_reply = completion.choices[0].message.content
-
-        # --- THE SANITIZER (Python Cleaning) ---
-        # 1. Block Code Leaks
-        forbidden = ["class ", "def ", "import ", "```"]
-        if any(bad_word in ai_reply for bad_word in forbidden):
-            ai_reply = f"I cannot write the code yet. Let's focus on the logic.\n\nHint: {current_step.required_concept}"
+        log_chat_turn(request.user_id, request.project_id, current_step.step_order, verdict, started, judge_ms, tutor_ms, usage)
+        return {"reply": ai_reply}
+
+# --- WORKSPACE SESSION (WebSocket) ---
+# One socket per open workspace. The client connects with ?token=<access_token>
+# from /login/ and then sends JSON messages:
+#   {"type": "chat", "message": "...", "id": 1}
+#   {"type": "run", "code": "...", "language": "python", "test": false, "id": 2}
+#   {"type": "progress"}
+# Replies echo "id": chat.delta* -> chat.done, run.output* -> run.done, plus
+# "progress" whenever the learner advances.
+
+@app.websocket("/ws/workspace/{project_id}")
+async def workspace_socket(websocket: WebSocket, project_id: int, token: str = ""):
+    user_id = decode_access_token(token)
+    if user_id is None:
+        await websocket.close(code=4401)
+        return
+
+    session, created = await run_in_threadpool(WorkspaceSession.load, SessionLocal, user_id, project_id)
+    if not session:
+        await websocket.close(code=4404)
+        return
+    if created:
+        leaderboard.record_progress(user_id, project_id, 0)
+
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def send(payload):
+        async with send_lock:
+            await websocket.send_json(payload)
+
+    handlers = {"chat": workspace_chat, "run": workspace_run, "progress": workspace_progress}
+    limiters = {"chat": chat_limiter, "run": run_limiter}
+    tasks = set()
+
+    async def handle(handler, msg):
+        try:
+            await handler(session, msg, send)
+        except WebSocketDisconnect:
+            pass
+        except Overloaded as e:
+            await send({"type": "error", "id": msg.get("id"), "status": 429, "retry_after": e.retry_after, "detail": e.reason})
+        except Exception as e:
+            await send({"type": "error", "id": msg.get("id"), "detail": str(e)})
+
+    await send({"type": "ready", **session.progress()})
+    try:
+        while True:
+            try:
+                msg = await websocket.receive_json()
+            except ValueError:
+                await send({"type": "error", "detail": "Messages must be JSON"})
+                continue
+            handler = handlers.get(msg.get("type")) if isinstance(msg, dict) else None
+            if not handler:
+                await send({"type": "error", "id": msg.get("id") if isinstance(msg, dict) else None, "detail": "Unknown message type"})
+                continue
+            limiter = limiters.get(msg["type"])
+            if limiter:
+                allowed, retry_after = limiter.hit(session.user_id)
+                if not allowed:
+                    await send({"type": "error", "id": msg.get("id"), "status": 429, "retry_after": retry_after,
+                                "detail": "Too many requests. Slow down a little."})
+                    continue
+            # Chat and run are multiplexed: a long run doesn't hold up the next chat message
+            task = asyncio.create_task(handle(handler, msg))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def workspace_progress(session, msg, send):
+    await send({"type": "progress", "id": msg.get("id"), **session.progress()})
+
+async def workspace_chat(session, msg, send):
+    request_id = msg.get("id")
+    message = msg.get("message", "")
+
+    async with session.chat_lock:
+        started = time.perf_counter()
+        current_step = session.current_step
+        if not current_step:
+            await send({"type": "chat.done", "id": request_id, "reply": tutor.COMPLETED_REPLY})
+            return
+
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        judge_started = time.perf_counter()
+        verdict = await run_in_threadpool(tutor.judge, current_step, message, usage, session.user_id)
+        judge_ms = (time.perf_counter() - judge_started) * 1000
+
+        if "PASS" in verdict:
+            if await run_in_threadpool(session.advance, SessionLocal):
+                leaderboard.record_progress(session.user_id, session.project_id, current_step.step_order)
+            log_chat_turn(session.user_id, session.project_id, current_step.step_order, verdict, started, judge_ms, None, usage)
+            await send({"type": "chat.done", "id": request_id, "verdict": "PASS",
+                        "reply": tutor.reward_reply(current_step, session.current_step)})
+            await send({"type": "progress", **session.progress()})
+            return
+
+        def stream(emit):
+            # closing(): if emit raises (client gone), end the model stream and free the slot now
+            with closing(tutor.stream_tutor(session.level, session.project_title, current_step, message, usage, session.user_id)) as replies:
+                for text in replies:
+                    emit(text)
+
+        async def forward(text):
+            await send({"type": "chat.delta", "id": request_id, "text": text})
+
+        tutor_started = time.perf_counter()
+        await call_streaming(stream, forward)
+        tutor_ms = (time.perf_counter() - tutor_started) * 1000
+        log_chat_turn(session.user_id, session.project_id, current_step.step_order, verdict, started, judge_ms, tutor_ms, usage)
+        await send({"type": "chat.done", "id": request_id, "verdict": "FAIL"})
+
+async def workspace_run(session, msg, send):
+    request_id = msg.get("id")
+    code = msg.get("code", "")
+    runner = get_runner(msg.get("language", "python"))
+    if not runner:
+        await send({"type": "error", "id": request_id, "detail": f"Unsupported language: {msg.get('language')}"})
+        return
+
+    async def forward(text):
+        await send({"type": "run.output", "id": request_id, "text": text})
+
+    if msg.get("test"):
+        step = session.step(msg.get("step_order") or session.step_order)
+        if runner.language != "python" or not step:
+            await send({"type": "error", "id": request_id, "detail": "Step tests are only available for Python project steps"})
+            return
+        result = await run_in_threadpool(harness.run_step, step, session.steps, code)
+        await forward(result.pop("output"))
+    else:
+        result = await call_streaming(lambda emit: runner.run(code, on_output=emit), forward)
+        result.pop("output")
 
-        # 2. Strip Leaked Headers (Regex)
-        # Removes lines like "Concept Explanation:", "User Input:", etc.
-        ai_reply = re.sub(r'^(Concept Explanation|User Input|Current Step|INSTRUCTIONS|Question):?\s*', '', ai_reply, flags=re.MULTILINE | re.IGNORECASE)
-        
-        return {"reply": ai_reply.strip()}
\ No newline at end of file
+    await send({"type": "run.done", "id": request_id, **result})
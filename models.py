@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -28,12 +28,35 @@ class ProjectStep(Base):
     title = Column(String)
     required_concept = Column(Text)
     unlock_code = Column(Text)
+    test_code = Column(Text)       # Optional test_* functions run by /run/ (see harness.py)
+    benchmark_code = Column(Text)  # Optional bench(n) timed against the unlock_code reference
 
     project = relationship("Project", back_populates="steps")
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
+    __table_args__ = (
+        # One row per (user, project): lets progress creation be an upsert
+        Index("ux_user_progress_user_project", "user_id", "project_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     project_id = Column(Integer, ForeignKey("projects.id"))
-    current_step_order = Column(Integer, default=1)
\ No newline at end of file
+    current_step_order = Column(Integer, default=1)
+    version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped on every advance
+
+class ChatEvent(Base):
+    __tablename__ = "chat_events"
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime, index=True)
+    user_id = Column(Integer, index=True)
+    project_id = Column(Integer, index=True)
+    step_order = Column(Integer)
+
+    verdict = Column(String)      # PASS / FAIL as acted on
+    raw_verdict = Column(String)  # What the judge actually said
+    judge_ms = Column(Float)
+    tutor_ms = Column(Float)
+    total_ms = Column(Float)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
@@ -0,0 +1,72 @@
+from sqlalchemy import inspect, text, update
+from sqlalchemy.dialects.sqlite import insert
+
+import models
+
+# Progress writes that stay correct under concurrent chat messages (double
+# submits, two open tabs) without a lock around the request:
+#   - creation is a SELECT, then INSERT ... ON CONFLICT DO NOTHING on
+#     (user_id, project_id) only when no row was found
+#   - advancing is a conditional UPDATE on the step order + version that was
+#     read, so two PASSes for the same step can only advance it once.
+
+UNIQUE_INDEX = "ux_user_progress_user_project"
+
+
+def ensure_unique_index(bind):
+    # Databases created before the unique index may hold duplicate rows from
+    # the old racy auto-create. Keep the furthest row per (user, project).
+    if UNIQUE_INDEX in {ix["name"] for ix in inspect(bind).get_indexes("user_progress")}:
+        return
+    with bind.begin() as conn:
+        conn.execute(text("""
+            DELETE FROM user_progress WHERE id NOT IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id, project_id ORDER BY current_step_order DESC, id
+                    ) AS rn FROM user_progress
+                ) WHERE rn = 1
+            )
+        """))
+        conn.execute(text(f"CREATE UNIQUE INDEX {UNIQUE_INDEX} ON user_progress (user_id, project_id)"))
+
+
+def _find(db, user_id, project_id):
+    return db.query(models.UserProgress).filter(
+        models.UserProgress.user_id == user_id,
+        models.UserProgress.project_id == project_id
+    ).first()
+
+
+def get_or_create(db, user_id, project_id):
+    """Returns (progress, created). Safe to call from concurrent requests."""
+    # Nearly every call finds the row; a plain SELECT doesn't take SQLite's write lock
+    progress = _find(db, user_id, project_id)
+    if progress:
+        return progress, False
+
+    result = db.execute(
+        insert(models.UserProgress)
+        .values(user_id=user_id, project_id=project_id, current_step_order=1, version=0)
+        .on_conflict_do_nothing(index_elements=["user_id", "project_id"])
+    )
+    db.commit()
+    return _find(db, user_id, project_id), result.rowcount == 1
+
+
+def advance(db, progress_id, expected_step, expected_version):
+    """Move to the next step only if nobody else already did. Returns True if this call advanced it."""
+    result = db.execute(
+        update(models.UserProgress)
+        .where(
+            models.UserProgress.id == progress_id,
+            models.UserProgress.current_step_order == expected_step,
+            models.UserProgress.version == expected_version,
+        )
+        .values(
+            current_step_order=models.UserProgress.current_step_order + 1,
+            version=models.UserProgress.version + 1,
+        )
+    )
+    db.commit()
+    return result.rowcount == 1
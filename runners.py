@@ -0,0 +1,505 @@
+import hashlib
+import io
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from capture import capture_stdout
+from code_cache import code_cache
+
+# Execution backends behind /run/. Every runner returns the same shape:
+#   {"output": str, "language": str, "compile_ms": float, "run_ms": float, ...}
+# so the UI (and whoever sizes the workers) can tell compile cost from run cost.
+
+RUN_TIMEOUT = 10  # seconds, per submission
+# Live Python output is sent in batches: once this many chars are waiting, or
+# every FLUSH_INTERVAL seconds while the code runs, not once per print()
+FLUSH_SIZE = 4096
+FLUSH_INTERVAL = 0.05
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "2bos-runners")
+
+
+def _ms(started):
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def _source_hash(source):
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Runner:
+    language = None
+
+    def run(self, code, on_output=None):
+        """
+        Execute `code`. If `on_output` is given it is called with output text as
+        it becomes available (live for Python, once at the end for compiled languages).
+        """
+        raise NotImplementedError
+
+    def _result(self, output, compile_ms=0.0, run_ms=0.0, **extra):
+        return {"output": output, "language": self.language, "compile_ms": compile_ms, "run_ms": run_ms, **extra}
+
+
+class _TeeBuffer(io.StringIO):
+    """
+    StringIO that also passes what's written to `on_output`, batched by
+    FLUSH_SIZE and FLUSH_INTERVAL. A background thread sends output that sits
+    idle; `stop()` ends it and sends the rest.
+    """
+
+    def __init__(self, on_output):
+        super().__init__()
+        self._on_output = on_output
+        self._pending = []
+        self._pending_size = 0
+        self._lock = threading.Lock()  # keeps batches in order between writer and flusher
+        self._stopped = threading.Event()
+        self.error = None  # set once on_output fails; the run is then abandoned
+        self._flusher = threading.Thread(target=self._flush_idle, daemon=True)
+        self._flusher.start()
+
+    def write(self, s):
+        n = super().write(s)
+        if self.error is not None:
+            raise self.error
+        if s:
+            with self._lock:
+                self._pending.append(s)
+                self._pending_size += len(s)
+                if self._pending_size >= FLUSH_SIZE:
+                    self._send()
+        return n
+
+    def flush(self):
+        # print(..., flush=True) sends right away
+        with self._lock:
+            self._send()
+
+    def _send(self):
+        if self.error is not None:
+            raise self.error
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._pending_size = 0
+        try:
+            self._on_output(text)
+        except Exception as e:
+            self.error = e
+            raise
+
+    def _flush_idle(self):
+        while not self._stopped.wait(FLUSH_INTERVAL):
+            try:
+                self.flush()
+            except Exception:
+                return  # kept in self.error for the writer
+
+    def stop(self):
+        self._stopped.set()
+        self._flusher.join()
+        try:
+            self.flush()
+        except Exception:
+            pass  # kept in self.error for the caller
+
+
+def _emit(on_output, output):
+    if on_output:
+        on_output(output)
+
+
+class PythonRunner(Runner):
+    language = "python"
+
+    def run(self, code, on_output=None):
+        started = time.perf_counter()
+        try:
+            snippet = code_cache.compile(code)
+        except SyntaxError:
+            output = traceback.format_exc()
+            _emit(on_output, output)
+            return self._result(output, compile_ms=_ms(started))
+        compile_ms = _ms(started)
+
+        # Same deterministic source -> same output; skip the exec entirely
+        cached = code_cache.get_output(snippet)
+        if cached is not None:
+            _emit(on_output, cached)
+            return self._result(cached, compile_ms, cached=True)
+
+        buffer = _TeeBuffer(on_output) if on_output else io.StringIO()
+        started = time.perf_counter()
+        with capture_stdout(buffer) as capture:
+            try:
+                exec(snippet.code, {"__builtins__": __builtins__}, {})
+                error = None
+            except Exception:
+                error = traceback.format_exc()
+            finally:
+                if on_output:
+                    buffer.stop()  # the last batch goes out before anything below
+        run_ms = _ms(started)
+        if getattr(buffer, "error", None) is not None:
+            raise buffer.error  # the consumer went away, even if the code swallowed the error
+        if error is not None:
+            output = error
+            _emit(on_output, output)
+        else:
+            output = buffer.getvalue() or "Code Executed."
+            if not buffer.getvalue():
+                _emit(on_output, output)
+        if capture.isolated:
+            # Only an output nothing else could have written into is worth replaying
+            code_cache.put_output(snippet, output)
+        return self._result(output, compile_ms, run_ms)
+
+
+class CppRunner(Runner):
+    """
+    g++ backend. Binaries are stored under CACHE_DIR by source hash, so an
+    unchanged submission (or one compiled by another worker) skips g++.
+    """
+
+    language = "cpp"
+    flags = ["-O2", "-std=c++17", "-pipe"]
+
+    def __init__(self, max_binaries=256):
+        self.max_binaries = max_binaries
+        self._dir = os.path.join(CACHE_DIR, "cpp")
+        self._binaries = OrderedDict()  # hash -> path, for eviction
+        self._errors = OrderedDict()    # hash -> compiler output
+        self._lock = threading.Lock()
+
+    def _compile(self, code):
+        """Returns (binary path or None, compiler output, compile_ms, cached)."""
+        key = _source_hash(code)
+        binary = os.path.join(self._dir, key)
+        with self._lock:
+            if key in self._errors:
+                return None, self._errors[key], 0.0, True
+            if os.path.exists(binary):
+                self._binaries[key] = binary
+                self._binaries.move_to_end(key)
+                return binary, "", 0.0, True
+
+        if shutil.which("g++") is None:
+            return None, "C++ is not available: g++ was not found on the server.", 0.0, False
+
+        os.makedirs(self._dir, exist_ok=True)
+        # Per-compile paths: identical submissions racing each other must not
+        # share (or delete) one another's source or output file
+        scratch = f"{binary}.{os.getpid()}.{threading.get_ident()}"
+        source, partial = f"{scratch}.cpp", f"{scratch}.tmp"
+        with open(source, "w") as f:
+            f.write(code)
+
+        started = time.perf_counter()
+        try:
+            proc = subprocess.run(["g++", *self.flags, source, "-o", partial],
+                                  capture_output=True, text=True, timeout=60)
+        except subprocess.TimeoutExpired:
+            _remove_quietly(partial)
+            return None, "Compilation timed out.", _ms(started), False
+        finally:
+            _remove_quietly(source)
+        compile_ms = _ms(started)
+        diagnostics = proc.stderr.replace(source, "main.cpp")
+
+        with self._lock:
+            if proc.returncode != 0:
+                _remove_quietly(partial)
+                self._errors[key] = diagnostics
+                while len(self._errors) > self.max_binaries:
+                    self._errors.popitem(last=False)
+                return None, diagnostics, compile_ms, False
+
+            os.replace(partial, binary)  # atomic, so a concurrent run never sees half a binary
+            self._binaries[key] = binary
+            while len(self._binaries) > self.max_binaries:
+                _, old = self._binaries.popitem(last=False)
+                _remove_quietly(old)
+        return binary, diagnostics, compile_ms, False
+
+    def run(self, code, on_output=None):
+        binary, diagnostics, compile_ms, cached = self._compile(code)
+        if binary is None:
+            _emit(on_output, diagnostics)
+            return self._result(diagnostics, compile_ms, compile_cached=cached)
+
+        started = time.perf_counter()
+        try:
+            proc = subprocess.run([binary], capture_output=True, text=True, timeout=RUN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            output = f"Timed out after {RUN_TIMEOUT}s."
+            _emit(on_output, output)
+            return self._result(output, compile_ms, _ms(started), compile_cached=cached)
+        run_ms = _ms(started)
+
+        output = proc.stdout + proc.stderr
+        if proc.returncode != 0:
+            output = f"{output}\nProcess exited with code {proc.returncode}".lstrip()
+        output = output or "Code Executed."
+        _emit(on_output, output)
+        return self._result(output, compile_ms, run_ms, compile_cached=cached)
+
+
+# Long-lived JVM that compiles submissions in memory with javax.tools and runs
+# each one in a fresh ClassLoader. Protocol over stdin/stdout: every field is a
+# 4-byte big-endian length followed by UTF-8 bytes.
+#   request:  key, class name, source
+#   response: status (ok | compile_error | error), compile_ms, run_ms, cached (0/1), output
+JAVA_WORKER_SOURCE = r"""
+import javax.tools.*;
+import java.io.*;
+import java.lang.reflect.*;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.util.*;
+
+public class RunnerWorker {
+    static final int MAX_CACHED = 256;
+
+    // Compiled class bytes by source hash, least recently used evicted first
+    static final Map<String, Map<String, byte[]>> compiled = new LinkedHashMap<String, Map<String, byte[]>>(64, 0.75f, true) {
+        protected boolean removeEldestEntry(Map.Entry<String, Map<String, byte[]>> e) { return size() > MAX_CACHED; }
+    };
+
+    static class Source extends SimpleJavaFileObject {
+        final String code;
+        Source(String name, String code) {
+            super(URI.create("string:///" + name + ".java"), Kind.SOURCE);
+            this.code = code;
+        }
+        public CharSequence getCharContent(boolean ignoreErrors) { return code; }
+    }
+
+    static class ClassBytes extends SimpleJavaFileObject {
+        final ByteArrayOutputStream out = new ByteArrayOutputStream();
+        ClassBytes(String name) { super(URI.create("bytes:///" + name.replace('.', '/') + ".class"), Kind.CLASS); }
+        public OutputStream openOutputStream() { return out; }
+    }
+
+    static class MemoryLoader extends ClassLoader {
+        final Map<String, byte[]> classes;
+        MemoryLoader(Map<String, byte[]> classes) {
+            super(RunnerWorker.class.getClassLoader());
+            this.classes = classes;
+        }
+        protected Class<?> findClass(String name) throws ClassNotFoundException {
+            byte[] b = classes.get(name);
+            if (b == null) throw new ClassNotFoundException(name);
+            return defineClass(name, b, 0, b.length);
+        }
+    }
+
+    static String read(DataInputStream in) throws IOException {
+        byte[] b = new byte[in.readInt()];
+        in.readFully(b);
+        return new String(b, StandardCharsets.UTF_8);
+    }
+
+    static void write(DataOutputStream out, String s) throws IOException {
+        byte[] b = s.getBytes(StandardCharsets.UTF_8);
+        out.writeInt(b.length);
+        out.write(b);
+    }
+
+    public static void main(String[] args) throws Exception {
+        JavaCompiler javac = ToolProvider.getSystemJavaCompiler();
+        StandardJavaFileManager std = javac.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        DataOutputStream out = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(FileDescriptor.out)));
+        PrintStream realOut = System.out, realErr = System.err;
+
+        while (true) {
+            String key, className, source;
+            try {
+                key = read(in);
+                className = read(in);
+                source = read(in);
+            } catch (EOFException e) {
+                return;
+            }
+
+            long t0 = System.nanoTime();
+            Map<String, byte[]> classes = compiled.get(key);
+            boolean cached = classes != null;
+            if (classes == null) {
+                DiagnosticCollector<JavaFileObject> diags = new DiagnosticCollector<>();
+                Map<String, ClassBytes> outputs = new HashMap<>();
+                JavaFileManager fm = new ForwardingJavaFileManager<JavaFileManager>(std) {
+                    public JavaFileObject getJavaFileForOutput(Location loc, String name, JavaFileObject.Kind kind, FileObject sibling) {
+                        ClassBytes cb = new ClassBytes(name);
+                        outputs.put(name, cb);
+                        return cb;
+                    }
+                };
+                boolean ok = javac.getTask(null, fm, diags, null, null, List.of(new Source(className, source))).call();
+                if (!ok) {
+                    StringBuilder sb = new StringBuilder();
+                    for (Diagnostic<? extends JavaFileObject> d : diags.getDiagnostics()) sb.append(d).append('\n');
+                    respond(out, "compile_error", (System.nanoTime() - t0) / 1e6, 0, false, sb.toString());
+                    continue;
+                }
+                classes = new HashMap<>();
+                for (Map.Entry<String, ClassBytes> e : outputs.entrySet()) classes.put(e.getKey(), e.getValue().out.toByteArray());
+                compiled.put(key, classes);
+            }
+            double compileMs = (System.nanoTime() - t0) / 1e6;
+
+            ByteArrayOutputStream buf = new ByteArrayOutputStream();
+            PrintStream ps = new PrintStream(buf, true, "UTF-8");
+            String status = "ok";
+            long t1 = System.nanoTime();
+            System.setOut(ps);
+            System.setErr(ps);
+            try {
+                Method m = new MemoryLoader(classes).loadClass(className).getMethod("main", String[].class);
+                m.invoke(null, (Object) new String[0]);
+            } catch (InvocationTargetException e) {
+                e.getCause().printStackTrace(ps);
+                status = "error";
+            } catch (Throwable e) {
+                e.printStackTrace(ps);
+                status = "error";
+            } finally {
+                System.out.flush();
+                System.setOut(realOut);
+                System.setErr(realErr);
+            }
+            respond(out, status, compileMs, (System.nanoTime() - t1) / 1e6, cached, buf.toString("UTF-8"));
+        }
+    }
+
+    static void respond(DataOutputStream out, String status, double compileMs, double runMs, boolean cached, String output) throws IOException {
+        write(out, status);
+        write(out, String.valueOf(compileMs));
+        write(out, String.valueOf(runMs));
+        write(out, cached ? "1" : "0");
+        write(out, output);
+        out.flush();
+    }
+}
+"""
+
+
+class JavaRunner(Runner):
+    """
+    Keeps one warm JVM (RunnerWorker) and sends it submissions, instead of paying
+    JVM startup + javac for every Run. Submissions are serialised through the
+    worker; a hung or crashed submission kills the JVM and the next one restarts it.
+    """
+
+    language = "java"
+
+    def __init__(self):
+        self._dir = os.path.join(CACHE_DIR, "java", _source_hash(JAVA_WORKER_SOURCE)[:16])
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _start_worker(self):
+        if shutil.which("java") is None or shutil.which("javac") is None:
+            raise RuntimeError("Java is not available: java/javac were not found on the server.")
+        if not os.path.exists(os.path.join(self._dir, "RunnerWorker.class")):
+            os.makedirs(self._dir, exist_ok=True)
+            source = os.path.join(self._dir, "RunnerWorker.java")
+            with open(source, "w") as f:
+                f.write(JAVA_WORKER_SOURCE)
+            subprocess.run(["javac", "-d", self._dir, source], check=True, capture_output=True, timeout=120)
+        self._proc = subprocess.Popen(
+            ["java", "-Xshare:auto", "-XX:+UseSerialGC", "-cp", self._dir, "RunnerWorker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    def _stop_worker(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def close(self):
+        with self._lock:
+            self._stop_worker()
+
+    @staticmethod
+    def class_name(code):
+        match = re.search(r"public\s+(?:final\s+)?class\s+(\w+)", code) or re.search(r"\bclass\s+(\w+)", code)
+        return match.group(1) if match else "Main"
+
+    def _send(self, *fields):
+        for field in fields:
+            data = field.encode()
+            self._proc.stdin.write(struct.pack(">I", len(data)) + data)
+        self._proc.stdin.flush()
+
+    def _read(self):
+        header = self._proc.stdout.read(4)
+        if len(header) < 4:
+            raise EOFError("Java worker exited")
+        (size,) = struct.unpack(">I", header)
+        return self._proc.stdout.read(size).decode()
+
+    def run(self, code, on_output=None):
+        result = self._run(code)
+        _emit(on_output, result["output"])
+        return result
+
+    def _run(self, code):
+        with self._lock:
+            warm_ms = 0.0
+            if self._proc is None or self._proc.poll() is not None:
+                started = time.perf_counter()
+                try:
+                    self._start_worker()
+                except Exception as e:
+                    self._proc = None
+                    return self._result(str(e))
+                warm_ms = _ms(started)
+
+            # A submission that never returns (infinite loop, System.in read) takes the JVM down with it
+            watchdog = threading.Timer(RUN_TIMEOUT, self._proc.kill)
+            watchdog.start()
+            try:
+                self._send(_source_hash(code), self.class_name(code), code)
+                status, compile_ms, run_ms, cached, output = (self._read() for _ in range(5))
+            except (EOFError, OSError, BrokenPipeError):
+                timed_out = not watchdog.is_alive()
+                self._stop_worker()
+                message = f"Timed out after {RUN_TIMEOUT}s." if timed_out else "The Java worker crashed (did the program call System.exit?)."
+                return self._result(message, worker_start_ms=warm_ms)
+            finally:
+                watchdog.cancel()
+
+        return self._result(
+            output or "Code Executed.", round(float(compile_ms), 3), round(float(run_ms), 3),
+            compile_cached=cached == "1", status=status, worker_start_ms=warm_ms,
+        )
+
+
+RUNNERS = {
+    "python": PythonRunner(),
+    "cpp": CppRunner(),
+    "java": JavaRunner(),
+}
+ALIASES = {"py": "python", "c++": "cpp"}
+
+
+def get_runner(language):
+    return RUNNERS.get(ALIASES.get(language.lower(), language.lower()))
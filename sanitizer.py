@@ -0,0 +1,304 @@
+import re
+
+# Code-leak sanitizer for tutor replies.
+#
+# The tutor may explain a concept but must not hand out code before the judge
+# passes the learner. Instead of rejecting a whole reply because "def " shows
+# up in a sentence, replies are read line by line and only the spans that are
+# actually Python get replaced with a marker:
+#   - fenced blocks (``` ... ```)
+#   - statement lines: def/class headers, imports, assignments, bare calls,
+#     return/raise of an expression, pass/break/continue, one-line if/for/while,
+#     also behind a label ("Step 1:", "Hint:") or a blockquote marker
+#   - indented blocks under a compound header (if/for/while/with/try/else...)
+#   - inline `backtick` spans holding a statement, and def/class signatures mid-sentence
+# StreamSanitizer works on arbitrary chunks and only ever buffers the current
+# line (plus one pending header line), so memory stays constant per stream.
+# Once the start of a line rules out every line-level rule it is prose, and
+# it's released up to the last space as it arrives instead of at the newline.
+
+REDACTED = "[code hidden]"
+MAX_LINE = 4096  # longer "lines" are processed as-is rather than buffered
+
+LEAKED_HEADERS = re.compile(r'^(Concept Explanation|User Input|Current Step|INSTRUCTIONS|Question):?\s*', re.IGNORECASE)
+
+FENCE = re.compile(r"^\s*(?:```|~~~)")
+
+_IDENT = r"[A-Za-z_]\w*"
+_TARGET = rf"{_IDENT}(?:\.{_IDENT})*(?:\[[^\]\n]*\])?"
+_STATEMENTS = [
+    rf"(?:async\s+)?def\s+{_IDENT}\s*\(",                          # def name(
+    rf"class\s+{_IDENT}\s*[(:]",                                     # class Name: / class Name(
+    rf"import\s+[\w.]+(?:\s+as\s+{_IDENT})?(?:\s*,\s*[\w.]+)*\s*$",  # import heapq
+    rf"from\s+[\w.]+\s+import\s+[\w*(]",                             # from x import y
+    rf"{_TARGET}(?:\s*,\s*{_TARGET})*\s*(?:[-+*/%&|^@]|//|\*\*|<<|>>)?=(?!=)\s*\S",  # a.b = c, x += 1
+    rf"(?:return|yield|raise)\s+{_TARGET}(?:\(.*\))?\s*$",          # return self.head
+    r"(?:return|pass|break|continue)\s*$",
+    rf"(?:await\s+)?(?!O\()(?:{_IDENT})(?:\.{_IDENT})*\(.*\)\s*$",    # heapq.heappush(heap, x), not O(n)
+]
+# One-line compound statement: "if self.head is None: self.head = new_song"
+_ONE_LINER = r"(?:(?:el)?if|while|for|with|else|try)\b[^:\n]*:\s*(?:" + "|".join(_STATEMENTS) + r")"
+# What may precede a statement on the same line: blockquote markers, a list
+# bullet or number, and a short label ("Step 1:", "Hint:", "Then:"). After a
+# label a bare call isn't enough: "Insert: O(log n)" and "get: lookup(key)"
+# read as prose far more often than as code.
+_MARKERS = r"^\s*(?:>\s*)*(?:[-*]\s+|\d+\.\s+)?"
+_LABEL = r"[A-Za-z][\w ]{0,24}:\s+"
+_PREFIX = _MARKERS + rf"(?:{_LABEL})?"
+STATEMENT_LINE = re.compile(
+    _MARKERS + r"(?:(?:" + "|".join(_STATEMENTS + [_ONE_LINER]) + r")"
+    + rf"|{_LABEL}(?:" + "|".join(_STATEMENTS[:-1] + [_ONE_LINER]) + r"))"
+)
+
+# Compound headers that are only code if an indented body follows
+BLOCK_HEADER = re.compile(
+    _PREFIX + r"(?:(?:el)?if\s+.+|while\s+.+|for\s+.+\s+in\s+.+|with\s+.+|else|try|finally|except\b.*)\s*:\s*(?:#.*)?$"
+)
+
+INLINE_CODE = re.compile(r"`([^`\n]+)`")
+# Statements except bare calls: `get()` or `_remove(node)` in prose is fine to mention
+INLINE_STATEMENT = re.compile(r"^\s*(?:" + "|".join(_STATEMENTS[:-1]) + r")")
+INLINE_SIGNATURE = re.compile(rf"\b(?:def\s+{_IDENT}\s*\([^)\n]*\)\s*(?:->\s*[\w\[\], .]+)?:?|class\s+[A-Z]\w*\s*(?:\([^)\n]*\))?\s*:)")
+
+
+# Line starts that can still become a statement or header, see _is_prose_start
+_KEYWORDS = {
+    "def", "class", "import", "from", "return", "yield", "raise", "pass", "break", "continue",
+    "async", "await", "if", "elif", "while", "for", "with", "else", "try", "finally", "except",
+}
+_LEAD = re.compile(r"\s*(?:>\s*)*(?:[-*]\s+|\d+\.\s+)?")
+_PARTIAL_MARKER = re.compile(r"[-*>]|\d+\.?")
+_LABEL_START = re.compile(r"[A-Za-z][\w ]{0,24}")
+_WORD = re.compile(r"[A-Za-z_][\w.]*")
+# Unfinished inline signatures ("def add(self, ") that must not be split
+_SIGNATURE_START = re.compile(r"\b(?:def|class)\b")
+_SIGNATURE_PREFIX = re.compile(
+    rf"def(?:\s+(?:{_IDENT}(?:\s*(?:\([^)\n]*(?:\)\s*(?:-|->[\w\[\], .]*)?)?)?)?)?)?"
+    r"|class(?:\s+(?:[A-Z]\w*\s*(?:\([^)\n]*\)?\s*)?)?)?"
+)
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip(" \t"))
+
+
+def _redact_inline(line):
+    if "`" not in line and "def" not in line and "class" not in line:
+        return line, 0  # most prose: nothing either pattern could match
+    count = 0
+
+    def backtick(match):
+        nonlocal count
+        if INLINE_STATEMENT.match(match.group(1)):
+            count += 1
+            return REDACTED
+        return match.group(0)
+
+    line = INLINE_CODE.sub(backtick, line)
+    line, n = INLINE_SIGNATURE.subn(REDACTED, line)
+    return line, count + n
+
+
+def _prose_body(text):
+    """Whether `text` (markers and label stripped) already reads as a sentence."""
+    if not (text[0].isalpha() or text[0] == "_"):
+        return True  # no statement starts with a digit, quote or bracket
+    word = _WORD.match(text)
+    if word.group() in _KEYWORDS or word.end() == len(text):
+        return False
+    rest = text[word.end():]
+    if rest[0].isspace():
+        rest = rest.lstrip()
+        return bool(rest) and (rest[0].isalnum() or rest[0] in "'\"(`")
+    return rest[0] in "'!?;"
+
+
+def _is_prose_start(text):
+    """
+    True once the start of a line can't be matched by FENCE, STATEMENT_LINE or
+    BLOCK_HEADER whatever follows, so the rest of the line is plain prose.
+    """
+    rest = text[_LEAD.match(text).end():]
+    if not rest or _PARTIAL_MARKER.fullmatch(rest) or rest[0] in "`~":
+        return False
+    if not (rest[0].isalpha() or rest[0] == "_"):
+        return True
+    word = _WORD.match(rest)
+    if word.group() in _KEYWORDS or word.end() == len(rest):
+        return False
+    label = _LABEL_START.match(rest)
+    if label.end() == len(rest):
+        return False  # may still turn into "Step 1:"
+    if rest[label.end()] == ":":
+        after = rest[label.end() + 1:]
+        if not after:
+            return False
+        if after[0].isspace():
+            after = after.lstrip()
+            return bool(after) and _prose_body(after)
+    return _prose_body(rest)
+
+
+def _release_point(text):
+    """How much of a prose line can go out now without splitting an inline span."""
+    cut = max(text.rfind(" "), text.rfind("\t")) + 1
+    if text.count("`", 0, cut) % 2:
+        cut = text.rfind("`", 0, cut)  # hold the open backtick span
+    if "def" not in text and "class" not in text:
+        return cut
+    for match in _SIGNATURE_START.finditer(text, 0, cut):
+        if _SIGNATURE_PREFIX.fullmatch(text, match.start()):
+            return match.start()  # may still grow
+        signature = INLINE_SIGNATURE.match(text, match.start())
+        if signature:
+            cut = max(cut, signature.end())  # complete, release it whole
+    return cut
+
+
+class StreamSanitizer:
+    """
+    Incremental sanitizer: `feed(chunk)` returns whatever text is now safe to
+    send, `close()` returns the rest. `redactions` counts replaced spans and
+    `prose_emitted` tells whether anything besides markers got through.
+    """
+
+    def __init__(self):
+        self._partial = ""        # current incomplete line
+        self._pending = None      # compound header waiting to see if a body follows
+        self._in_fence = False
+        self._block_indent = None  # indent of the header whose body we're hiding
+        self._block_blank = False
+        self._last_redacted = False
+        self._prose_line = False  # current line already known to be prose
+        self.redactions = 0
+        self.prose_emitted = False
+
+    # --- OUTPUT HELPERS ---
+    def _emit_redacted(self, out):
+        if not self._last_redacted:
+            self.redactions += 1
+            out.append(REDACTED + "\n")
+            self._last_redacted = True
+
+    def _emit_prose(self, out, line):
+        line = LEAKED_HEADERS.sub("", line)
+        line, n = _redact_inline(line)
+        self.redactions += n
+        if line.strip() and line.strip() != REDACTED:
+            self.prose_emitted = True
+        out.append(line + "\n")
+        self._last_redacted = False if line.strip() else self._last_redacted
+
+    def _emit_fragment(self, out, text, end=""):
+        # Part of a prose line; leaked headers were stripped when it was decided
+        text, n = _redact_inline(text)
+        self.redactions += n
+        if text.replace(REDACTED, "").strip():
+            self.prose_emitted = True
+        if text.strip():
+            self._last_redacted = False
+        out.append(text + end)
+
+    # --- LINE STATE MACHINE ---
+    def _line(self, line, out):
+        if self._in_fence:
+            if FENCE.match(line):
+                self._in_fence = False
+            return
+
+        if self._block_indent is not None:
+            if not line.strip():
+                self._block_blank = True
+                return
+            if _indent(line) > self._block_indent:
+                return
+            self._block_indent = None
+            if self._block_blank:
+                out.append("\n")
+                self._block_blank = False
+
+        if self._pending is not None:
+            header, self._pending = self._pending, None
+            if line.strip() and _indent(line) > _indent(header):
+                self._emit_redacted(out)
+                self._block_indent = _indent(header)
+                return
+            if not line.strip():
+                # Still undecided; keep holding the header until real content shows up
+                self._pending = header
+                self._block_blank = True
+                return
+            self._emit_prose(out, header)
+            if self._block_blank:
+                out.append("\n")
+                self._block_blank = False
+
+        if FENCE.match(line):
+            self._in_fence = True
+            self._emit_redacted(out)
+        elif STATEMENT_LINE.match(line):
+            self._emit_redacted(out)
+            if line.rstrip().endswith(":"):
+                self._block_indent = _indent(line)
+                self._block_blank = False
+        elif BLOCK_HEADER.match(line):
+            self._pending = line
+            self._block_blank = False
+        else:
+            self._emit_prose(out, line)
+
+    def _end_line(self, line, out):
+        if self._prose_line:
+            self._prose_line = False
+            self._emit_fragment(out, line, "\n")
+        else:
+            self._line(line, out)
+
+    def _release(self, out):
+        if not self._prose_line:
+            if self._in_fence or self._block_indent is not None or self._pending is not None:
+                return
+            if not _is_prose_start(self._partial):
+                return
+            self._prose_line = True
+            self._partial = LEAKED_HEADERS.sub("", self._partial)
+        cut = _release_point(self._partial)
+        if cut > 0:
+            self._emit_fragment(out, self._partial[:cut])
+            self._partial = self._partial[cut:]
+
+    # --- STREAM API ---
+    def feed(self, chunk):
+        self._partial += chunk
+        mid_word = " " not in chunk and "\n" not in chunk and "\t" not in chunk
+        if self._prose_line and mid_word and len(self._partial) <= MAX_LINE:
+            return ""  # mid-word in a prose line: nothing new to release
+        out = []
+        while "\n" in self._partial:
+            line, self._partial = self._partial.split("\n", 1)
+            self._end_line(line, out)
+        if len(self._partial) > MAX_LINE:
+            line, self._partial = self._partial, ""
+            self._end_line(line, out)
+        elif self._partial:
+            self._release(out)
+        return "".join(out)
+
+    def close(self):
+        out = []
+        if self._partial or self._prose_line:
+            self._end_line(self._partial, out)
+            self._partial = ""
+        if self._pending is not None:
+            # A header with nothing after it reads as prose ("if you get stuck:")
+            self._emit_prose(out, self._pending)
+            self._pending = None
+        text = "".join(out)
+        return text[:-1] if text.endswith("\n") else text
+
+
+def sanitize(text):
+    """Sanitize a complete reply. Returns (clean_text, redactions, prose_emitted)."""
+    s = StreamSanitizer()
+    clean = s.feed(text) + s.close()
+    return clean, s.redactions, s.prose_emitted
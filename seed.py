@@ -1,5 +1,7 @@
 from database import SessionLocal, engine
 import models
+from cache import backend as cache_backend
+from catalog import bump_version as bump_catalog_version
 
 # 1. HARD RESET: Drop all tables and recreate them to ensure clean IDs
 models.Base.metadata.drop_all(bind=engine)
@@ -31,7 +33,9 @@ def create_project(title, diff, desc, solution_context, steps_data):
             step_order=idx,
             title=step["title"],
             required_concept=step["concept"],
-            unlock_code=step["code"]
+            unlock_code=step["code"],
+            test_code=step.get("tests"),
+            benchmark_code=step.get("benchmark")
         )
         db.add(s)
     db.commit()
@@ -79,7 +83,19 @@ create_project(
             self.tail.next = new_song
             self.tail = new_song
         self.size += 1
-        print(f"Added: {title}")"""
+        print(f"Added: {title}")""",
+            "tests": """def test_first_song_is_head_and_tail():
+    q = MusicQueue()
+    q.add_song("Intro", "Band")
+    assert q.head is q.tail, "With one song, head and tail should be the same node"
+    assert q.size == 1
+
+def test_songs_are_appended_in_order():
+    q = MusicQueue()
+    for title in ["A", "B", "C"]:
+        q.add_song(title, "Band")
+    assert [q.head.title, q.head.next.title, q.tail.title] == ["A", "B", "C"]
+    assert q.size == 3"""
         },
         {
             "title": "Play Next",
@@ -95,7 +111,20 @@ create_project(
             self.tail = None
             
         self.size -= 1
-        return f"Playing: {current_song.title}" """
+        return f"Playing: {current_song.title}" """,
+            "tests": """def test_play_in_fifo_order():
+    q = MusicQueue()
+    q.add_song("A", "Band")
+    q.add_song("B", "Band")
+    assert q.play_next() == "Playing: A"
+    assert q.play_next() == "Playing: B"
+
+def test_empty_queue_resets_tail():
+    q = MusicQueue()
+    q.add_song("A", "Band")
+    q.play_next()
+    assert q.head is None and q.tail is None, "Tail must be cleared when the last song is played"
+    assert q.play_next() == "Queue Empty" """
         }
     ]
 )
@@ -142,7 +171,16 @@ create_project(
         
         self.future.append(self.current_text)
         self.current_text = self.history.pop()
-        return self.current_text"""
+        return self.current_text""",
+            "tests": """def test_undo_restores_previous_text():
+    e = TextEditor()
+    e.write("a")
+    e.write("ab")
+    assert e.undo() == "a"
+    assert e.undo() == ""
+
+def test_undo_on_empty_history():
+    assert TextEditor().undo() == "Nothing to undo" """
         },
         {
             "title": "Redo Logic",
@@ -153,7 +191,20 @@ create_project(
             
         self.history.append(self.current_text)
         self.current_text = self.future.pop()
-        return self.current_text"""
+        return self.current_text""",
+            "tests": """def test_redo_after_undo():
+    e = TextEditor()
+    e.write("a")
+    e.write("ab")
+    e.undo()
+    assert e.redo() == "ab"
+
+def test_new_write_clears_redo():
+    e = TextEditor()
+    e.write("a")
+    e.undo()
+    e.write("b")
+    assert e.redo() == "Nothing to redo" """
         }
     ]
 )
@@ -186,7 +237,14 @@ create_project(
             val = _id % 62
             short_url.append(self.chars[val])
             _id = _id // 62
-        return "".join(short_url[::-1])"""
+        return "".join(short_url[::-1])""",
+            "tests": """def test_single_digit():
+    s = URLShortener()
+    assert s._id_to_short(1) == "1"
+    assert s._id_to_short(61) == "Z"
+
+def test_carries_into_next_digit():
+    assert URLShortener()._id_to_short(62) == "10" """
         },
         {
             "title": "Shorten & Restore",
@@ -200,7 +258,16 @@ create_project(
 
     # Note: Real restoration requires decoding Base62 back to ID,
     # but for this MVP we can just lookup if we knew the ID.
-    # (Or implement _short_to_id logic)."""
+    # (Or implement _short_to_id logic).""",
+            "tests": """def test_shorten_stores_and_encodes():
+    s = URLShortener()
+    short = s.shorten("https://example.com")
+    assert short.startswith("http://tiny.url/")
+    assert s.url_map[1000000] == "https://example.com"
+
+def test_ids_are_unique():
+    s = URLShortener()
+    assert s.shorten("https://a.com") != s.shorten("https://b.com")"""
         }
     ]
 )
@@ -246,7 +313,19 @@ create_project(
                         if friend not in target_user.friends:
                             recommendations.add(friend)
                             
-        return [u.id for u in recommendations]"""
+        return [u.id for u in recommendations]""",
+            "tests": """def test_friends_of_friends_are_recommended():
+    a, b, c = User(1), User(2), User(3)
+    a.add_friend(b)
+    b.add_friend(c)
+    assert a.get_recommendations(a) == [3]
+
+def test_direct_friends_are_not_recommended():
+    a, b, c = User(1), User(2), User(3)
+    a.add_friend(b)
+    a.add_friend(c)
+    b.add_friend(c)
+    assert a.get_recommendations(a) == []"""
         }
     ]
 )
@@ -281,7 +360,19 @@ create_project(
             if char not in node.children:
                 node.children[char] = TrieNode()
             node = node.children[char]
-        node.is_end_of_word = True"""
+        node.is_end_of_word = True""",
+            "tests": """def test_insert_marks_end_of_word():
+    t = Trie()
+    t.insert("cat")
+    node = t.root.children["c"].children["a"].children["t"]
+    assert node.is_end_of_word
+    assert not t.root.children["c"].is_end_of_word
+
+def test_shared_prefix_reuses_nodes():
+    t = Trie()
+    t.insert("car")
+    t.insert("cat")
+    assert len(t.root.children) == 1"""
         },
         {
             "title": "Search Prefix",
@@ -300,7 +391,25 @@ create_project(
             words.append(prefix)
         for char, child in node.children.items():
             words.extend(self._collect_words(child, prefix + char))
-        return words"""
+        return words""",
+            "tests": """def test_prefix_returns_all_completions():
+    t = Trie()
+    for w in ["car", "cart", "cat", "dog"]:
+        t.insert(w)
+    assert sorted(t.search("ca")) == ["car", "cart", "cat"]
+
+def test_missing_prefix_returns_empty():
+    t = Trie()
+    t.insert("dog")
+    assert t.search("x") == []""",
+            "benchmark": """BENCH_OPS = 5000
+
+def bench(n):
+    t = Trie()
+    for i in range(n):
+        t.insert(f"word{i}")
+    for i in range(0, n, 50):
+        t.search(f"word{i}")"""
         }
     ]
 )
@@ -334,7 +443,18 @@ create_project(
         if name not in self.current.children:
             self.current.children[name] = Directory(name)
         else:
-            print("Directory already exists")"""
+            print("Directory already exists")""",
+            "tests": """def test_mkdir_adds_child():
+    fs = FileSystem()
+    fs.mkdir("docs")
+    assert "docs" in fs.root.children
+
+def test_mkdir_is_idempotent():
+    fs = FileSystem()
+    fs.mkdir("docs")
+    first = fs.root.children["docs"]
+    fs.mkdir("docs")
+    assert fs.root.children["docs"] is first"""
         },
         {
             "title": "Change Directory (cd)",
@@ -346,7 +466,17 @@ create_project(
         elif name in self.current.children:
             self.current = self.current.children[name]
         else:
-            print("Directory not found")"""
+            print("Directory not found")""",
+            "tests": """def test_cd_moves_into_child():
+    fs = FileSystem()
+    fs.mkdir("docs")
+    fs.cd("docs")
+    assert fs.current.name == "docs"
+
+def test_cd_missing_directory_stays_put():
+    fs = FileSystem()
+    fs.cd("nope")
+    assert fs.current is fs.root"""
         }
     ]
 )
@@ -412,7 +542,31 @@ class Order:
                 if buy.quantity == 0: heapq.heappop(self.buy_heap)
                 if sell.quantity == 0: heapq.heappop(self.sell_heap)
             else:
-                break # No more matches possible"""
+                break # No more matches possible""",
+            "tests": """def test_crossing_orders_trade():
+    book = OrderBook()
+    book.add_order(101, 10, True)
+    book.add_order(100, 4, False)
+    book.match_orders()
+    assert not book.sell_heap
+    assert book.buy_heap[0].quantity == 6
+
+def test_no_trade_when_spread_is_open():
+    book = OrderBook()
+    book.add_order(99, 10, True)
+    book.add_order(100, 10, False)
+    book.match_orders()
+    assert len(book.buy_heap) == 1 and len(book.sell_heap) == 1""",
+            "benchmark": """BENCH_OPS = 20000
+
+def bench(n):
+    book = OrderBook()
+    for i in range(n):
+        # Prices straddle 100 so roughly half the orders cross
+        book.add_order(95 + (i * 7) % 11, 10, i % 2 == 0)
+        if i % 8 == 0:
+            book.match_orders()
+    book.match_orders()"""
         }
     ]
 )
@@ -490,7 +644,38 @@ create_project(
             # Evict LRU (node before tail)
             lru = self.tail.prev
             self._remove(lru)
-            del self.cache_map[lru.key]"""
+            del self.cache_map[lru.key]""",
+            "tests": """def test_get_returns_value_or_minus_one():
+    cache = LRUCache(2)
+    cache.put(1, "a")
+    assert cache.get(1) == "a"
+    assert cache.get(2) == -1
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    cache.get(1)
+    cache.put(3, "c")
+    assert cache.get(2) == -1, "Key 2 was least recently used and should be evicted"
+    assert cache.get(1) == "a" and cache.get(3) == "c"
+
+def test_put_existing_key_updates_value():
+    cache = LRUCache(2)
+    cache.put(1, "a")
+    cache.put(1, "b")
+    assert cache.get(1) == "b"
+    assert len(cache.cache_map) == 1""",
+            "benchmark": """BENCH_OPS = 50000
+
+def bench(n):
+    cache = LRUCache(512)
+    for i in range(n):
+        key = (i * 31) % 1024
+        if i % 3 == 0:
+            cache.put(key, i)
+        else:
+            cache.get(key)"""
         }
     ]
 )
@@ -600,4 +785,7 @@ def build_tree(text):
 )
 
 db.close()
+
+# Running servers rebuild their cached /projects/ payloads on their next check
+bump_catalog_version(cache_backend)
 print("SUCCESS: 2BOS Library Fully Populated.")
\ No newline at end of file
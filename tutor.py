@@ -0,0 +1,148 @@
+import hashlib
+from openai import OpenAI
+
+from cache import Cache, backend as cache_backend
+from admission import admission
+from sanitizer import StreamSanitizer, sanitize as sanitize_text
+
+# The "Professor Architecture": a judge that gates code rewards, and a tutor
+# that answers everything else without handing out code. Shared by /chat/ and
+# the workspace WebSocket.
+
+client = OpenAI(base_url="http://localhost:11434/v1", api_key="ollama")
+MODEL = "qwen2.5-coder:3b"
+
+# temperature=0 -> the same prompt gets the same verdict; share it across workers
+verdicts = Cache(cache_backend, "verdict", ttl=24 * 3600)
+
+COMPLETED_REPLY = "CONGRATULATIONS! You have completed all steps. Feel free to experiment."
+
+
+def add_usage(usage, completion):
+    # Ollama reports token counts; other backends may leave usage empty
+    if completion.usage:
+        usage["prompt_tokens"] += completion.usage.prompt_tokens or 0
+        usage["completion_tokens"] += completion.usage.completion_tokens or 0
+
+
+# --- JUDGE ---
+def judge_prompt(step, message):
+    return f"""
+    Role: Logic Examiner.
+    Goal: "{step.required_concept}"
+    User Input: "{message}"
+
+    Did the user correctly explain the logic/variables?
+    OUTPUT ONLY: PASS or FAIL
+    """
+
+
+def judge(step, message, usage, user_id=None):
+    """Returns the judge's raw verdict, upper-cased. Any failure counts as FAIL (and isn't cached)."""
+    prompt = judge_prompt(step, message)
+    key = hashlib.sha256(f"{MODEL}\0{prompt}".encode()).hexdigest()
+    cached = verdicts.get(key)
+    if cached:
+        return cached
+
+    with admission.slot(user_id):  # Overloaded propagates; only model errors count as FAIL
+        try:
+            judge_res = client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "system", "content": prompt}],
+                temperature=0.0, max_tokens=5
+            )
+            add_usage(usage, judge_res)
+            verdict = judge_res.choices[0].message.content.strip().upper()
+        except: return "FAIL"
+
+    verdicts.set(key, verdict)
+    return verdict
+
+
+def reward_reply(step, next_step):
+    next_text = f"Next Goal: {next_step.title}." if next_step else "Project Complete!"
+    return f"**Correct!**\n\nHere is the implementation:\n```python\n{step.unlock_code}\n```\n\n{next_text}"
+
+
+# --- TUTOR ---
+def tutor_prompt(level, project_title, step, message):
+    level = level or "Beginner"
+
+    if level == "Beginner":
+        persona = "You are a patient teacher. Use analogies."
+    elif level == "Advanced":
+        persona = "You are a Lead Architect. Be concise and technical."
+    else:
+        persona = "You are a Senior Developer. Be direct."
+
+    # We give it an EXAMPLE of a good response to follow
+    return f"""
+        {persona}
+        Context: Project "{project_title}".
+        Goal: Help user with "{step.required_concept}" without giving code.
+
+        User: "{message}"
+
+        Your Response Guidelines:
+        1. Explain the concept briefly.
+        2. Ask a specific question to guide them.
+        3. NO headers. NO meta-talk.
+        """
+
+
+def _tutor_request(level, project_title, step, message, **kwargs):
+    return client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "system", "content": tutor_prompt(level, project_title, step, message)}],
+        temperature=0.3, max_tokens=350, **kwargs
+    )
+
+
+def tutor(level, project_title, step, message, usage, user_id=None):
+    with admission.slot(user_id):
+        completion = _tutor_request(level, project_title, step, message)
+    add_usage(usage, completion)
+    return sanitize(completion.choices[0].message.content, step)
+
+
+def stream_tutor(level, project_title, step, message, usage, user_id=None):
+    """
+    Yields the tutor's reply line by line as the model produces it, with code
+    spans already redacted (see sanitizer.py). The model slot is held until
+    the stream ends.
+    """
+    with admission.slot(user_id):
+        stream = _tutor_request(level, project_title, step, message, stream=True, stream_options={"include_usage": True})
+        cleaner = StreamSanitizer()
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    add_usage(usage, chunk)
+                if not chunk.choices:
+                    continue
+                text = cleaner.feed(chunk.choices[0].delta.content or "")
+                if text:
+                    yield text
+            text = cleaner.close()
+            if cleaner.redactions and not cleaner.prose_emitted:
+                yield _blocked_reply(step)
+            elif text:
+                yield text
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+
+
+# --- THE SANITIZER (Python Cleaning) ---
+def _blocked_reply(step):
+    return f"I cannot write the code yet. Let's focus on the logic.\n\nHint: {step.required_concept}"
+
+
+def sanitize(ai_reply, step):
+    # Code spans are redacted and leaked prompt headers stripped. If nothing but
+    # code came back, fall back to the hint.
+    clean, redactions, prose = sanitize_text(ai_reply)
+    if redactions and not prose:
+        return _blocked_reply(step)
+    return clean.strip()
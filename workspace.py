@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import models
+import progress as progress_store
+
+# State for one workspace WebSocket (see /ws/workspace/{project_id} in main.py).
+# User, project, steps and progress are read once at connect time and then
+# kept here, so chat and run messages don't go back to the DB to find them.
+
+
+class WorkspaceSession:
+    def __init__(self, user, project, steps, progress):
+        self.user_id = user.id
+        self.level = user.proficiency_level
+        self.project_id = project.id
+        self.project_title = project.title
+        self.steps = sorted(steps, key=lambda s: s.step_order)
+        self._by_order = {s.step_order: s for s in self.steps}
+        self.progress_id = progress.id
+        self.step_order = progress.current_step_order
+        self.version = progress.version
+        self.chat_lock = asyncio.Lock()  # one judged turn at a time per session
+
+    @classmethod
+    def load(cls, session_factory, user_id, project_id):
+        """Returns (session, progress_created), or (None, False) if the user or project doesn't exist."""
+        db = session_factory()
+        try:
+            user = db.query(models.User).filter(models.User.id == user_id).first()
+            project = db.query(models.Project).filter(models.Project.id == project_id).first()
+            if not user or not project:
+                return None, False
+
+            progress, created = progress_store.get_or_create(db, user_id, project_id)
+            steps = list(project.steps)
+            return cls(user, project, steps, progress), created
+        finally:
+            db.close()
+
+    def step(self, step_order):
+        return self._by_order.get(step_order)
+
+    @property
+    def current_step(self):
+        return self._by_order.get(self.step_order)
+
+    def advance(self, session_factory):
+        """
+        Advance past the current step. Returns False if another tab or request
+        got there first; the session then resyncs to what's in the DB.
+        """
+        db = session_factory()
+        try:
+            advanced = progress_store.advance(db, self.progress_id, self.step_order, self.version)
+            progress = db.query(models.UserProgress).filter(models.UserProgress.id == self.progress_id).one()
+            self.step_order, self.version = progress.current_step_order, progress.version
+        finally:
+            db.close()
+        return advanced
+
+    def progress(self):
+        total = len(self.steps)
+        step = self.current_step
+        return {
+            "project_id": self.project_id,
+            "current_step": self.step_order,
+            "total_steps": total,
+            "step_title": step.title if step else None,
+            "percent": min(100, max(0, int((self.step_order - 1) / total * 100))) if total else 0,
+        }
+
+
+class StreamClosed(Exception):
+    """Raised inside the worker by `emit` once the consumer has gone away."""
+
+
+async def call_streaming(fn, on_item, max_pending=32):
+    """
+    Run blocking `fn(emit)` on the default executor. Every `emit(item)` from the
+    worker thread is delivered, in order, to `await on_item(item)` on the event
+    loop while fn is still running. Returns fn's result (or raises its error).
+
+    At most `max_pending` items wait for delivery; past that `emit` blocks, so
+    a slow client slows the worker down instead of growing the queue. If
+    delivery fails (socket closed) or the caller is cancelled, `emit` raises
+    StreamClosed so the worker stops instead of running to the end.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_pending)
+    done = object()
+    closed = threading.Event()
+
+    def emit(item):
+        if closed.is_set():
+            raise StreamClosed()
+        pending = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                return pending.result(timeout=0.1)
+            except FutureTimeout:
+                if closed.is_set():  # nobody will make room any more
+                    pending.cancel()
+                    raise StreamClosed()
+
+    def target():
+        try:
+            return fn(emit)
+        finally:
+            try:
+                emit(done)
+            except StreamClosed:
+                pass
+
+    future = loop.run_in_executor(None, target)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            await on_item(item)
+    except BaseException:
+        closed.set()
+        # Nobody awaits the worker now; retrieve its error so it isn't logged as unhandled
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        raise
+    return await future